@@ -0,0 +1,43 @@
+# Compares appending traces one at a time through the growable trace
+# store against the repeated np.concatenate that SEC.append used to
+# perform. Run from the repository root with
+#     python benchmarks/bench_append.py
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis.store import TraceStore
+
+POINTS = 18000
+TRACES = 500
+
+
+def append_concatenate(new_traces):
+    traces = new_traces[0]
+    for trace in new_traces[1:]:
+        traces = np.concatenate((traces, trace), axis=1)
+    return traces
+
+
+def append_store(new_traces):
+    store = TraceStore(new_traces[0])
+    for trace in new_traces[1:]:
+        store.append(trace)
+    return store.array
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    new_traces = [rng.normal(size=(POINTS, 1)) for _ in range(TRACES)]
+
+    for name, method in (('np.concatenate', append_concatenate),
+                         ('TraceStore', append_store)):
+        start = time.perf_counter()
+        traces = method(new_traces)
+        elapsed = time.perf_counter() - start
+        assert np.array_equal(traces, np.hstack(new_traces))
+        print(f'{name:>15}: {TRACES} appends of {POINTS} points '
+              f'in {elapsed:7.3f} s')
@@ -0,0 +1,43 @@
+# Compares the batched LOESS baseline against fitting each trace
+# separately with pybaselines and reports the largest difference
+# between the two. Run from the repository root with
+#     python benchmarks/bench_baseline.py
+
+import os
+import sys
+import time
+import numpy as np
+from pybaselines import Baseline
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis.baseline import BASELINE_PARAMS, batch_loess
+from analysis.ecosec import read_ecosec
+
+TEST_FILE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test.txt')
+TRACES = 50
+
+
+if __name__ == '__main__':
+    times, trace = read_ecosec(TEST_FILE)
+    rng = np.random.default_rng(0)
+    traces = (trace * rng.uniform(0.5, 2.0, TRACES)
+              + rng.normal(0, 0.05, (len(times), TRACES))
+              + np.outer(times, rng.uniform(-0.05, 0.05, TRACES)))
+    params = BASELINE_PARAMS['loess']
+
+    start = time.perf_counter()
+    fitter = Baseline(times, check_finite=False)
+    expected = np.column_stack([
+        fitter.loess(traces[:, i], **params)[0] for i in range(TRACES)
+    ])
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baselines = batch_loess(times, traces, **params)
+    batched = time.perf_counter() - start
+
+    print(f'{TRACES} traces of {len(times)} points')
+    print(f'  pybaselines per trace {single:7.3f} s')
+    print(f'  batch_loess           {batched:7.3f} s  '
+          f'speedup {single/batched:4.1f}x')
+    print(f'  max difference        {np.abs(baselines - expected).max():.2e}')
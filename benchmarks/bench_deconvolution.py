@@ -0,0 +1,93 @@
+# Compares the deconvolution fit with the analytic jacobian and the
+# broadcast peak model against the previous fit, which rebuilt the
+# model with a loop over the peaks and left least_squares to estimate
+# the jacobian by finite differences. Both fits scale their steps by
+# the jacobian, as the fit does, so that they reach the same minimum
+# and only differ in how the jacobian is found. Run from the repository
+# root with
+#     python benchmarks/bench_deconvolution.py
+
+import os
+import sys
+import time
+import numpy as np
+from scipy.optimize import least_squares
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis.deconvolution import (PENALTY, PeakModel, fit_bounds,
+                                    gaussian, initial_guesses,
+                                    peak_components)
+
+POINTS = 4000
+LBOUND = 1e3
+RBOUND = 1e6
+REPEATS = 3
+
+
+def loop_residuals(params, mws, trace, peaks, penalty):
+    new_trace = np.zeros_like(trace)
+    for i in range(peaks):
+        new_trace += params[3*i+2]*gaussian(mws, params[3*i],
+                                            params[3*i+1])
+    calc_resids = new_trace - trace
+    calc_resids[calc_resids>0] *= penalty
+    return calc_resids
+
+
+def fit_finite_differences(mws, trace, peaks, bounds, guess):
+    res = least_squares(loop_residuals, guess, bounds=bounds,
+                        x_scale='jac', args=(mws, trace, peaks, PENALTY))
+    return res['cost'], res['nfev']
+
+
+def fit_analytic(mws, trace, peaks, bounds, guess):
+    model = PeakModel(mws, trace)
+    res = least_squares(model.residuals, guess, jac=model.jacobian,
+                        bounds=bounds, x_scale='jac')
+    return res['cost'], res['nfev']
+
+
+def synthetic_trace(peaks, rng):
+    # A sum of well separated log-normal peaks with some noise
+    mws = np.geomspace(RBOUND, LBOUND, POINTS)
+    mns = np.geomspace(3e3, 3e5, peaks)*rng.uniform(0.9, 1.1, peaks)
+    params = np.column_stack((
+        mns, rng.uniform(1.05, 1.4, peaks), rng.uniform(0.5, 1.5, peaks)
+    )).ravel()
+    trace = peak_components(params, mws).sum(axis=1)
+    return mws, trace + rng.normal(0, 0.005, POINTS)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    # The two fits can take different paths to the minimum, so the
+    # time per iteration is shown alongside the total time
+    print(f'{"peaks":>5} {"finite diff (s)":>16} {"analytic (s)":>13} '
+          f'{"speedup":>8} {"per iteration":>14} {"cost ratio":>11}')
+    for peaks in range(2, 7):
+        mws, trace = synthetic_trace(peaks, rng)
+        bounds = fit_bounds(peaks, LBOUND, RBOUND)
+        guess = initial_guesses(mws, trace, peaks, LBOUND, RBOUND, 2)[1]
+
+        timings = {}
+        costs = {}
+        iterations = {}
+        for name, method in (('finite', fit_finite_differences),
+                             ('analytic', fit_analytic)):
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                costs[name], iterations[name] = method(
+                    mws, trace, peaks, bounds, guess
+                )
+            timings[name] = (time.perf_counter() - start) / REPEATS
+
+        # A faster fit is only useful if it is as good
+        cost_ratio = costs['analytic']/costs['finite']
+        assert np.isclose(cost_ratio, 1, rtol=1e-2), cost_ratio
+        per_iteration = ((timings['finite']/iterations['finite']) /
+                         (timings['analytic']/iterations['analytic']))
+        print(f'{peaks:>5} {timings["finite"]:>16.3f} '
+              f'{timings["analytic"]:>13.3f} '
+              f'{timings["finite"]/timings["analytic"]:>7.1f}x '
+              f'{per_iteration:>13.1f}x '
+              f'{cost_ratio:>11.3f}')
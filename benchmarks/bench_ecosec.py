@@ -0,0 +1,54 @@
+# Compares the bulk EcoSEC reader against the np.genfromtxt parser
+# that SEC originally used. Run from the repository root with
+#     python benchmarks/bench_ecosec.py
+
+import os
+import sys
+import tempfile
+import timeit
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis.ecosec import read_ecosec
+
+TEST_FILE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test.txt')
+
+
+def write_wide_file(filename, traces, points=18000):
+    # Synthetic multi-detector export with the same layout as the
+    # files written by the Tosoh EcoSEC software
+    times = np.arange(points) / 600
+    data = np.empty((points, 2*traces))
+    data[:, ::2] = times[:, None]
+    data[:, 1::2] = np.random.default_rng(0).normal(size=(points, traces))
+    with open(filename, 'w', newline='') as f:
+        f.write('RSLT0001 (Chromatogram RI)\t' * traces + '\r\n')
+        f.write('X:\tY:\t' * traces + '\r\n')
+        np.savetxt(f, data, fmt='%.5f', delimiter='\t', newline='\r\n')
+
+
+def compare(filename, repeat=5):
+    rt, traces = read_ecosec(filename)
+    raw = np.genfromtxt(filename, skip_header=2)
+    assert np.array_equal(rt, raw[:, 0])
+    assert np.array_equal(traces, np.atleast_2d(raw[:, 1::2]))
+
+    old = min(timeit.repeat(
+        lambda: np.genfromtxt(filename, skip_header=2),
+        number=1, repeat=repeat
+    ))
+    new = min(timeit.repeat(
+        lambda: read_ecosec(filename), number=1, repeat=repeat
+    ))
+    print(f'{os.path.basename(filename):>14} {traces.shape[1]:>4} traces '
+          f'genfromtxt {old*1e3:8.1f} ms  read_ecosec {new*1e3:8.1f} ms  '
+          f'speedup {old/new:5.1f}x')
+
+
+if __name__ == '__main__':
+    compare(TEST_FILE)
+    with tempfile.TemporaryDirectory() as tmp:
+        for traces in (4, 16):
+            filename = os.path.join(tmp, f'wide_{traces}.txt')
+            write_wide_file(filename, traces)
+            compare(filename, repeat=3)
@@ -0,0 +1,70 @@
+# Compares changing the normalization of a large set of traces with
+# the layered edits of SEC, which only replace a scale factor per
+# trace, against the previous model that copied the baseline corrected
+# traces and normalized the copy in place. Reading the visible traces,
+# as the chart does, is included in both. Run from the repository
+# root with
+#     python benchmarks/bench_edits.py
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis.sec import SEC
+
+TEST_FILE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test.txt')
+TRACES = 2000
+VISIBLE = 10
+REPEATS = 5
+
+
+def normalize_copies(baselined, lbound, rbound):
+    edited = baselined.copy()
+    edited /= np.max(edited[lbound:rbound], axis=0)
+    return np.array(edited[:, :VISIBLE], order='F')
+
+
+def normalize_layers(sec, lbound, rbound):
+    sec.restore_edits()
+    sec.peak_normalize('individual', lbound, rbound)
+    return np.array(sec.edited_traces[:, :VISIBLE], order='F')
+
+
+def measure(method, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        result = method(*args)
+    elapsed = (time.perf_counter() - start) / REPEATS
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+if __name__ == '__main__':
+    for dtype in (np.float64, np.float32):
+        sec = SEC(TEST_FILE, out_of_core=False, dtype=dtype)
+        other = SEC(TEST_FILE)
+        sec.extend([other] * (TRACES - 1))
+        sec.reset_traces()
+        sec.edited_traces = sec.gpc_traces - 0.01
+        sec.save_edits()
+        baselined = np.asarray(sec.edited_traces, dtype=np.float64)
+        lbound, rbound = 100, len(sec.retention_times) - 100
+
+        expected, copies, copies_peak = measure(
+            normalize_copies, baselined, lbound, rbound
+        )
+        result, layers, layers_peak = measure(
+            normalize_layers, sec, lbound, rbound
+        )
+        assert np.allclose(result, expected, rtol=1e-5)
+        print(f'{np.dtype(dtype).name}: {TRACES} traces of '
+              f'{len(sec.retention_times)} points, {VISIBLE} visible')
+        print(f'  copied traces {copies*1000:8.1f} ms '
+              f'{copies_peak/1024**2:8.1f} MB')
+        print(f'  edit layers   {layers*1000:8.1f} ms '
+              f'{layers_peak/1024**2:8.1f} MB')
@@ -0,0 +1,43 @@
+# Measures how long the numeric core takes to import in a fresh
+# interpreter, using the -X importtime report of Python itself, and
+# checks that neither Qt nor matplotlib is loaded along the way. Run
+# from the repository root with
+#     python benchmarks/bench_import.py
+
+import os
+import subprocess
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+MODULES = ('analysis.sec', 'analysis.cache', 'analysis.baseline')
+FORBIDDEN = ('PySide6', 'matplotlib', 'scipy', 'pybaselines')
+
+
+def import_report(module):
+    # Each module is imported in its own interpreter so that nothing
+    # is already cached in sys.modules
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC, capture_output=True, text=True, check=True
+    )
+
+    # Every line reads "import time: self | cumulative | name", with
+    # nested imports indented beneath the module that imported them
+    loaded = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        loaded[name.strip()] = int(cumulative)
+    return loaded
+
+
+if __name__ == '__main__':
+    for module in MODULES:
+        loaded = import_report(module)
+        heavy = sorted({name.split('.')[0] for name in loaded
+                        if name.split('.')[0] in FORBIDDEN})
+        print(f'{module}: {loaded[module] / 1e6:.3f} s, '
+              f'{len(loaded)} modules')
+        if heavy:
+            print(f'    also imported: {", ".join(heavy)}')
@@ -0,0 +1,52 @@
+# Compares the memory used to hold a large campaign of traces in the
+# in-memory trace store against the memory-mapped store on disk. The
+# traces are appended a file at a time, copied as SEC.reset_traces
+# does and normalized in place. Memory allocated by numpy is followed
+# with tracemalloc, which does not count the pages of mapped files
+# that the operating system is free to drop. Run from the repository
+# root with
+#     python benchmarks/bench_out_of_core.py
+
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from analysis.store import MappedTraceStore, TraceStore
+
+POINTS = 18000
+FILES = 100
+TRACES_PER_FILE = 20
+
+
+def run(store_class):
+    rng = np.random.default_rng(0)
+    file_traces = rng.normal(size=(POINTS, TRACES_PER_FILE))
+    raw = store_class(file_traces)
+    edited = store_class(file_traces)
+    for _ in range(FILES - 1):
+        raw.append(file_traces)
+        edited.append(file_traces)
+
+    edited.assign(raw.array)
+    traces = edited.array
+    traces /= np.max(traces, axis=0)
+    return len(raw)
+
+
+if __name__ == '__main__':
+    size = POINTS*FILES*TRACES_PER_FILE*8 / 1024**2
+    print(f'{FILES*TRACES_PER_FILE} traces of {POINTS} points, '
+          f'{size:.0f} MB per copy')
+    for name, store_class in (('TraceStore', TraceStore),
+                              ('MappedTraceStore', MappedTraceStore)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        run(store_class)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f'{name:>17}: peak memory {peak/1024**2:8.1f} MB '
+              f'in {elapsed:6.2f} s')
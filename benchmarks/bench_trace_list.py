@@ -0,0 +1,73 @@
+# Compares listing a large set of traces in the Graph tab with the
+# trace model, which only draws the visible rows, against the previous
+# list that created a line edit, button and check box for every trace.
+# Importing a second batch of traces is included in both, which the
+# previous list rebuilt from the start. The widgets are allocated by
+# Qt rather than Python, so they are counted instead of measured. Run
+# from the repository root with
+#     QT_QPA_PLATFORM=offscreen python benchmarks/bench_trace_list.py
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from PySide6 import QtCore, QtWidgets
+from analysis.sec import SEC
+from tabs.graph_tab import GraphTab
+
+TEST_FILE = os.path.join(os.path.dirname(__file__), '..', 'tests', 'test.txt')
+TRACES = 1000
+
+
+def list_widgets(trace_list, sec):
+    trace_list.clear()
+    for i in range(len(sec)):
+        trace_widget = QtWidgets.QWidget()
+        trace_layout = QtWidgets.QHBoxLayout(trace_widget)
+        trace_layout.setContentsMargins(20, 0, 40, 0)
+        button = QtWidgets.QPushButton()
+        button.setStyleSheet('background-color: {}'.format(sec.colors[i]))
+        button.setFixedSize(20, 20)
+        box = QtWidgets.QCheckBox()
+        box.setCheckState(QtCore.Qt.Checked)
+        trace_layout.addWidget(QtWidgets.QLineEdit(sec.names[i]))
+        trace_layout.addStretch()
+        trace_layout.addWidget(button)
+        trace_layout.addWidget(box)
+
+        list_item = QtWidgets.QListWidgetItem()
+        list_item.setSizeHint(trace_widget.sizeHint())
+        trace_list.addItem(list_item)
+        trace_list.setItemWidget(list_item, trace_widget)
+
+
+def measure(app, view, method, *args):
+    start = time.perf_counter()
+    method(*args)
+    view.show()
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    return elapsed, len(view.findChildren(QtWidgets.QWidget))
+
+
+if __name__ == '__main__':
+    app = QtWidgets.QApplication(sys.argv)
+    other = SEC(TEST_FILE)
+    for name, create in (('widget list', QtWidgets.QListWidget),
+                         ('trace model', GraphTab)):
+        sec = SEC(TEST_FILE, out_of_core=False)
+        sec.extend([other] * (TRACES//2 - 1))
+        view = create()
+        if isinstance(view, GraphTab):
+            method = view.add_data
+        else:
+            method = lambda sec, view=view: list_widgets(view, sec)
+
+        first, first_widgets = measure(app, view, method, sec)
+        sec.extend([other] * (TRACES//2))
+        second, second_widgets = measure(app, view, method, sec)
+        print(f'{name}: {TRACES//2} traces {first*1000:8.1f} ms '
+              f'{first_widgets:6d} widgets, {TRACES} traces '
+              f'{second*1000:8.1f} ms {second_widgets:6d} widgets')
+        view.close()
@@ -0,0 +1,383 @@
+import hashlib
+import os
+from collections import OrderedDict
+from math import ceil
+import numpy as np
+
+from analysis.grid import grid_fingerprint, resample_traces
+from analysis.workers import process_pool
+
+# The parameters used for each of the baseline correction options,
+# chosen empirically to work across the widest variety of SEC traces
+BASELINE_PARAMS = {
+    'loess': {'symmetric_weights': True, 'fraction': 0.35,
+              'scale': 1.5, 'poly_order': 2},
+    'stdev': {}
+}
+
+# Below this many traces the traces are fitted in the calling process;
+# a trace takes around 0.2 s to fit while starting the worker processes
+# takes over a second, so the files of a few traces gain nothing
+MIN_PARALLEL_TRACES = 16
+
+
+class BaselineCache:
+    def __init__(self, max_bytes=128*1024**2):
+        """
+        The BaselineCache class remembers fitted baselines so that a
+        trace is only fitted again when its data, the retention times
+        or the baseline method change
+
+        Parameters
+        ----------
+        max_bytes : int
+            The maximum memory used by the stored baselines, the least
+            recently used baselines are discarded once it is exceeded
+
+        Attributes
+        ----------
+        max_bytes : int
+            The maximum memory used by the stored baselines
+        nbytes : int
+            The memory currently used by the stored baselines
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._baselines = OrderedDict()
+
+
+    def keys(self, times, traces, option):
+        """
+        A method that returns the key identifying the baseline of each
+        trace, built from a hash of the trace, the retention times and
+        the baseline method with its parameters
+
+        Parameters
+        ----------
+        times : 1darray
+            The retention times shared by every trace
+        traces : 2darray
+            A 2D numpy array with one trace per column
+        option : string
+            The name of the baseline correction option
+
+        Returns
+        -------
+        keys : list
+            A list with the key of each trace
+        """
+        method = (option, tuple(sorted(BASELINE_PARAMS[option].items())),
+                  grid_fingerprint(times))
+        keys = []
+        for i in range(traces.shape[1]):
+            trace = np.ascontiguousarray(traces[:, i], dtype=np.float64)
+            digest = hashlib.blake2b(trace.tobytes(), digest_size=16)
+            keys.append(method + (digest.hexdigest(),))
+        return keys
+
+
+    def get(self, key):
+        """
+        A method that returns a stored baseline, or None when the
+        baseline has not been fitted yet
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the baseline
+
+        Returns
+        -------
+        baseline : 1darray
+            The stored baseline
+        """
+        baseline = self._baselines.get(key)
+        if baseline is not None:
+            self._baselines.move_to_end(key)
+        return baseline
+
+
+    def put(self, key, baseline):
+        """
+        A method that stores a baseline, discarding the least recently
+        used baselines when the memory limit is exceeded
+
+        Parameters
+        ----------
+        key : tuple
+            The key of the baseline
+        baseline : 1darray
+            The fitted baseline
+        """
+        if key in self._baselines:
+            self.nbytes -= self._baselines.pop(key).nbytes
+        baseline = np.array(baseline)
+        self._baselines[key] = baseline
+        self.nbytes += baseline.nbytes
+
+        while self.nbytes > self.max_bytes and self._baselines:
+            _, evicted = self._baselines.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+
+    def clear(self):
+        """
+        A method that discards every stored baseline
+        """
+        self._baselines.clear()
+        self.nbytes = 0
+
+
+    def __len__(self):
+        """
+        A method that returns how many baselines are stored
+
+        Returns
+        -------
+        length : int
+            The number of stored baselines
+        """
+        return len(self._baselines)
+
+
+def fit_baselines(times, traces, option, workers=None, cache=None):
+    """
+    Fits the baseline of every trace for one of the supported
+    baseline correction options
+
+    Parameters
+    ----------
+    times : 1darray
+        The retention times shared by every trace
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    option : string
+        The name of the technique to use for the baseline correction
+            loess : Locally estimated scatterplot smoothing, fitted
+                    for all traces at once by batch_loess
+            stdev : The standard deviation distribution algorithm,
+                    fitted in parallel processes once there are at
+                    least MIN_PARALLEL_TRACES traces
+    workers : int
+        The maximum number of processes used by the methods that fit
+        the traces in parallel, defaults to the number of processors
+    cache : BaselineCache
+        An optional cache of previously fitted baselines; only the
+        traces without a stored baseline are fitted
+
+    Returns
+    -------
+    baselines : 2darray
+        A 2D numpy array with the baseline of each trace per column
+    """
+    if option not in BASELINE_PARAMS:
+        raise ValueError(f"Unknown baseline option: {option}")
+
+    if cache is None:
+        return _fit_traces(times, traces, option, workers)
+
+    keys = cache.keys(times, traces, option)
+    baselines = np.empty(traces.shape)
+    missing = []
+    for i, key in enumerate(keys):
+        baseline = cache.get(key)
+        if baseline is None:
+            missing.append(i)
+        else:
+            baselines[:, i] = baseline
+
+    if missing:
+        baselines[:, missing] = _fit_traces(
+            times, traces[:, missing], option, workers
+        )
+        for i in missing:
+            cache.put(keys[i], baselines[:, i])
+
+    return baselines
+
+
+def _fit_traces(times, traces, option, workers):
+    # Fits every trace without consulting a cache
+    if option == 'loess':
+        return batch_loess(times, traces, **BASELINE_PARAMS['loess'])
+
+    num_traces = traces.shape[1]
+    workers = min(workers or os.cpu_count() or 1, num_traces)
+    if workers <= 1 or num_traces < MIN_PARALLEL_TRACES:
+        return _fit_trace_block(times, traces, option)
+
+    # The traces are split into one contiguous block per worker so
+    # that each process only receives the data it fits. The pool is
+    # shared and kept between fits, and its workers are spawned since
+    # the fits run on the chart worker thread of the interface
+    blocks = np.array_split(np.arange(num_traces), workers)
+    results = process_pool().map(
+        _fit_trace_block, [times] * workers,
+        [np.ascontiguousarray(traces[:, block]) for block in blocks],
+        [option] * workers
+    )
+    return np.concatenate(list(results), axis=1)
+
+
+def _fit_trace_block(times, traces, option):
+    # Fits the baselines of a block of traces one trace at a time
+    # with pybaselines; module level so it can be sent to a worker
+    # process. pybaselines, which pulls in most of scipy, is only
+    # imported when it is needed
+    from pybaselines import Baseline
+
+    baseline_fitter = Baseline(times, check_finite=False)
+    method = {
+        'loess': baseline_fitter.loess,
+        'stdev': baseline_fitter.std_distribution
+    }[option]
+
+    baselines = np.empty(traces.shape)
+    for i in range(traces.shape[1]):
+        baselines[:, i], _ = method(traces[:, i], **BASELINE_PARAMS[option])
+    return baselines
+
+
+def batch_loess(times, traces, fraction=0.2, poly_order=1, scale=3.0,
+                tol=1e-3, max_iter=10, symmetric_weights=False,
+                delta=None):
+    """
+    Fits a robust locally estimated scatterplot smoothing baseline to
+    every trace at once. This reproduces pybaselines' Baseline.loess,
+    but the fitting windows, distance kernels and polynomial terms
+    depend only on the retention times so they are computed once and
+    each local fit is solved for all traces with matrix products
+
+    Parameters
+    ----------
+    times : 1darray
+        The monotonically increasing retention times shared by every
+        trace
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    fraction : float
+        The fraction of the points used for each local fit
+    poly_order : int
+        The order of the local polynomials
+    scale : float
+        The scale factor applied to the residuals when computing the
+        robust weights
+    tol : float
+        The relative change in the baseline at which a trace is
+        considered converged
+    max_iter : int
+        The maximum number of reweighting iterations
+    symmetric_weights : bool
+        Whether positive and negative residuals are weighted equally
+    delta : float
+        Points within delta of the last fitted point are linearly
+        interpolated rather than fitted, defaults to 1% of the range
+
+    Returns
+    -------
+    baselines : 2darray
+        A 2D numpy array with the baseline of each trace per column
+    """
+    times = np.asarray(times, dtype=np.float64)
+    y = np.asarray(traces, dtype=np.float64)
+    num_x = len(times)
+    total_points = ceil(fraction * num_x)
+    if total_points < poly_order + 1 or total_points > num_x:
+        raise ValueError('The LOESS window must contain more points than '
+                         'the polynomial order and no more than the data')
+    if delta is None:
+        delta = 0.01 * (times[-1] - times[0])
+
+    # Shared precomputation: the fitted points, their windows and the
+    # tricube distance kernels, along with the polynomial terms and
+    # their pairwise products over times mapped onto [-1, 1]
+    fits, windows = _loess_windows(times, total_points, delta)
+    scaled = np.polynomial.polyutils.mapdomain(
+        times, (times[0], times[-1]), (-1.0, 1.0)
+    )
+    vander = np.polynomial.polynomial.polyvander(scaled, poly_order)
+    terms = poly_order + 1
+    products = (vander[:, :, None] * vander[:, None, :]).reshape(num_x, -1)
+    kernels = []
+    for fit, (left, right) in zip(fits, windows):
+        distance = np.abs(times[left:right] - times[fit])
+        distance = distance / max(distance[0], distance[-1])
+        kernels.append(((1 - distance**3)**3)[:, None])
+
+    baselines = y.copy()
+    sqrt_w = np.ones_like(y)
+    active = np.arange(y.shape[1])
+    for _ in range(max_iter + 1):
+        weights = sqrt_w[:, active]**2
+        weighted_y = weights * y[:, active]
+
+        fit_values = np.empty((len(fits), len(active)))
+        for j, (fit, (left, right)) in enumerate(zip(fits, windows)):
+            kernel = kernels[j]
+            gram = (kernel * products[left:right]).T @ weights[left:right]
+            rhs = (kernel * vander[left:right]).T @ weighted_y[left:right]
+            coefs = np.linalg.solve(
+                gram.T.reshape(-1, terms, terms), rhs.T[:, :, None]
+            )[:, :, 0]
+            fit_values[j] = coefs @ vander[fit]
+
+        old = baselines[:, active]
+        new = resample_traces(times[fits], fit_values, times)
+        baselines[:, active] = new
+
+        # Each trace stops iterating once its baseline converges, as
+        # it would when fitted on its own
+        change = (np.linalg.norm(new - old, axis=0) /
+                  np.maximum(np.linalg.norm(old, axis=0),
+                             np.finfo(float).eps))
+        residual = y[:, active] - new
+        mav = np.median(np.abs(residual), axis=0) / 0.6744897501960817
+        inner = residual / mav / scale
+        tukey = np.maximum(0, 1 - inner*inner)
+        if not symmetric_weights:
+            tukey = np.where(residual > 0, tukey, 1.0)
+        sqrt_w[:, active] = tukey
+
+        active = active[change >= tol]
+        if len(active) == 0:
+            break
+
+    return baselines
+
+
+def _loess_windows(times, total_points, delta):
+    # Chooses which points are fitted, skipping points within delta
+    # of the last fitted point, along with the window of
+    # total_points neighbouring points used for each fit
+    num_x = len(times)
+    fits = [0]
+    windows = [(0, total_points)]
+    skipped = False
+    skip_range = times[0] + delta
+    left, right = 0, total_points
+    for i in range(1, num_x - 1):
+        if delta > 0:
+            if times[i+1] < skip_range:
+                skipped = True
+                continue
+            skip_range = times[i] + delta
+            skipped = False
+
+        while (right < num_x and
+               times[i] - times[left] > times[right] - times[i]):
+            left += 1
+            right += 1
+        fits.append(i)
+        windows.append((left, right))
+
+    if skipped:
+        fits.append(num_x - 2)
+        if (times[-1] - times[-2] <
+            times[-2] - times[num_x - total_points]):
+            windows.append((num_x - total_points, num_x))
+        else:
+            windows.append((num_x - total_points - 1, num_x - 1))
+
+    fits.append(num_x - 1)
+    windows.append((num_x - total_points, num_x))
+    return np.array(fits), windows
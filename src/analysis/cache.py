@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sys
+import threading
+import numpy as np
+
+from analysis.ecosec import read_ecosec
+
+# Each cache entry is stored as a pair of .npy files sharing a key so
+# that both arrays can be memory-mapped independently
+ENTRY_SUFFIXES = ('.rt.npy', '.traces.npy')
+
+
+def default_cache_dir():
+    """
+    Returns the per-user directory in which imported SEC files are
+    cached
+
+    Returns
+    -------
+    cache_dir : string
+        The path of the cache directory
+    """
+    if sys.platform == 'win32':
+        base = os.environ.get(
+            'LOCALAPPDATA', os.path.expanduser('~\\AppData\\Local')
+        )
+        return os.path.join(base, 'Secan', 'cache')
+    if sys.platform == 'darwin':
+        return os.path.expanduser('~/Library/Caches/Secan')
+
+    base = os.environ.get(
+        'XDG_CACHE_HOME', os.path.expanduser('~/.cache')
+    )
+    return os.path.join(base, 'secan')
+
+
+class TraceCache:
+    def __init__(self, cache_dir=None, max_bytes=512*1024**2):
+        """
+        The TraceCache class stores the parsed contents of imported
+        SEC files as binary arrays so that reopening a file does not
+        require parsing the text export again
+
+        Parameters
+        ----------
+        cache_dir : string
+            The directory in which the cached arrays are stored,
+            defaults to the per-user cache directory
+        max_bytes : int
+            The maximum size of the cache on disk, the least recently
+            used entries are evicted once it is exceeded
+
+        Attributes
+        ----------
+        cache_dir : string
+            The directory in which the cached arrays are stored
+        max_bytes : int
+            The maximum size of the cache on disk
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+
+
+    def key(self, data_filename):
+        """
+        A method that returns the cache key of a data file, built from
+        its path, modification time, size and contents
+
+        Parameters
+        ----------
+        data_filename : string
+            The filename of the data file
+
+        Returns
+        -------
+        key : string
+            A hexadecimal digest identifying the file
+        """
+        path = os.path.abspath(data_filename)
+        stat = os.stat(path)
+
+        content_hash = hashlib.blake2b(digest_size=16)
+        with open(path, 'rb') as data_file:
+            for block in iter(lambda: data_file.read(1 << 20), b''):
+                content_hash.update(block)
+
+        key_hash = hashlib.blake2b(digest_size=16)
+        key_hash.update(
+            f'{path}\0{stat.st_mtime_ns}\0{stat.st_size}\0'.encode()
+        )
+        key_hash.update(content_hash.digest())
+        return key_hash.hexdigest()
+
+
+    def load(self, data_filename, reader=read_ecosec):
+        """
+        A method that returns the retention times and traces of a
+        data file, from the cache when possible and otherwise by
+        parsing the file and storing the result
+
+        Parameters
+        ----------
+        data_filename : string
+            The filename of the data file
+        reader : callable
+            The function used to parse the file on a cache miss; it
+            must return the retention times and the traces
+
+        Returns
+        -------
+        retention_times : 1darray
+            The retention times, memory-mapped when cached
+        traces : 2darray
+            The traces, memory-mapped when cached
+        """
+        key = self.key(data_filename)
+        rt_path, traces_path = self._entry_paths(key)
+
+        try:
+            retention_times = np.load(rt_path, mmap_mode='r')
+            traces = np.load(traces_path, mmap_mode='r')
+        except (OSError, ValueError):
+            pass
+        else:
+            # Refreshing the modification time marks the entry as
+            # recently used for the eviction order
+            for path in (rt_path, traces_path):
+                os.utime(path)
+            return retention_times, traces
+
+        retention_times, traces = reader(data_filename)
+        try:
+            self._store(key, retention_times, traces)
+        except OSError:
+            # A cache that cannot be written to should never prevent
+            # the data from being imported
+            pass
+        return retention_times, traces
+
+
+    def clear(self):
+        """
+        A method that removes every entry from the cache
+        """
+        for key in self._entries():
+            self._remove(key)
+
+
+    def size(self):
+        """
+        A method that returns the total size of the cache on disk
+
+        Returns
+        -------
+        size : int
+            The size of all the cached arrays in bytes
+        """
+        return sum(size for _, size in self._entries().values())
+
+
+    def _entry_paths(self, key):
+        return tuple(os.path.join(self.cache_dir, key + suffix)
+                     for suffix in ENTRY_SUFFIXES)
+
+
+    def _store(self, key, retention_times, traces):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # Writing to temporary files first ensures that a partially
+        # written entry is never loaded by another import
+        for path, array in zip(self._entry_paths(key),
+                               (retention_times, traces)):
+            temp_path = (f'{path}.{os.getpid()}.'
+                         f'{threading.get_ident()}.tmp')
+            with open(temp_path, 'wb') as temp_file:
+                np.save(temp_file, np.ascontiguousarray(array))
+            os.replace(temp_path, path)
+
+        self._evict()
+
+
+    def _entries(self):
+        # Collects the last access time and total size of every
+        # complete entry within the cache directory
+        entries = dict()
+        try:
+            names = os.listdir(self.cache_dir)
+        except FileNotFoundError:
+            return entries
+
+        for name in names:
+            for suffix in ENTRY_SUFFIXES:
+                if not name.endswith(suffix):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    continue
+                key = name[:-len(suffix)]
+                used, size = entries.get(key, (0, 0))
+                entries[key] = (max(used, stat.st_mtime_ns),
+                                size + stat.st_size)
+        return entries
+
+
+    def _evict(self):
+        entries = self._entries()
+        total = sum(size for _, size in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k][0]):
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= entries[key][1]
+
+
+    def _remove(self, key):
+        for path in self._entry_paths(key):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                # Windows refuses to delete files that are still
+                # memory-mapped; they are removed on a later eviction
+                pass
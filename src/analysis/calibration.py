@@ -0,0 +1,455 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import threading
+import numpy as np
+
+from analysis.grid import grid_fingerprint
+
+# The parameters of each calibration method, from the coefficient of
+# the highest power of the retention time to the constant term
+CALIBRATION_PARAMS = {
+    'linear': ('a', 'b'),
+    'cubic': ('a', 'b', 'c', 'd')
+}
+
+# The highest order of polynomial that can be fitted to the standards
+MAX_ORDER = 5
+
+# The version of the dictionaries that calibration curves are stored
+# as, increased whenever the stored fields change
+FORMAT_VERSION = 1
+
+# The number of calibrated molecular weight axes kept in memory, the
+# least recently used axes are discarded beyond it
+MAX_CACHED_AXES = 16
+
+# The cached axes are shared by the chart worker and the import
+# threads, so every access goes through the lock
+_axes = OrderedDict()
+_axes_lock = threading.Lock()
+
+
+class CalibrationAxis:
+    def __init__(self, mol_weights):
+        """
+        The CalibrationAxis class holds the molecular weight of every
+        retention time and converts between molecular weights and
+        positions on the axis. The sorted arrays used for the lookups
+        are built once so that each conversion is a binary search
+
+        Parameters
+        ----------
+        mol_weights : 1darray
+            The monotonic molecular weight of every retention time
+
+        Attributes
+        ----------
+        mol_weights : 1darray
+            The molecular weight of every retention time, read only
+            since the axis is shared between objects
+        """
+        self.mol_weights = np.array(mol_weights, dtype=np.float64)
+        self.mol_weights.flags.writeable = False
+
+        # Molecular weights usually decrease with the retention time,
+        # in which case the lookups search the reversed axis
+        self._decreasing = (len(mol_weights) > 1 and
+                            mol_weights[0] > mol_weights[-1])
+        order = slice(None, None, -1) if self._decreasing else slice(None)
+        self._size = len(mol_weights)
+        self._search = np.ascontiguousarray(self.mol_weights[order])
+        self._log_search = np.log10(self._search)
+        self._log_weights = np.log10(self.mol_weights)
+        self._positions = np.arange(self._size, dtype=np.float64)[order]
+
+
+    def position(self, weight):
+        """
+        A method that returns the index of a molecular weight, which
+        on a decreasing axis is the first point below the weight
+
+        Parameters
+        ----------
+        weight : float or 1darray
+            The molecular weight for which to find the position
+
+        Returns
+        -------
+        index : int or 1darray
+            The index of the specified molecular weight
+        """
+        if self._decreasing:
+            return self._size - self._search.searchsorted(weight)
+        return self._search.searchsorted(weight, side='right')
+
+
+    def fractional_position(self, weight):
+        """
+        A method that returns the position of a molecular weight,
+        interpolated between the neighbouring points in the logarithm
+        of the molecular weight
+
+        Parameters
+        ----------
+        weight : float or 1darray
+            The molecular weight for which to find the position
+
+        Returns
+        -------
+        position : float or 1darray
+            The fractional index of the specified molecular weight,
+            clamped to the ends of the axis
+        """
+        return np.interp(np.log10(weight), self._log_search, self._positions)
+
+
+    def weight_at(self, position):
+        """
+        A method that returns the molecular weight at a position on
+        the axis, interpolated between the neighbouring points in the
+        logarithm of the molecular weight
+
+        Parameters
+        ----------
+        position : float or 1darray
+            The fractional index on the axis
+
+        Returns
+        -------
+        weight : float or 1darray
+            The molecular weight at the specified position, clamped to
+            the ends of the axis
+        """
+        position = np.clip(position, 0, self._size - 1)
+        lower = np.minimum(np.floor(position).astype(int),
+                           max(self._size - 2, 0))
+        fraction = position - lower
+        upper = np.minimum(lower + 1, self._size - 1)
+        return 10**((1 - fraction)*self._log_weights[lower] +
+                    fraction*self._log_weights[upper])
+
+
+    def __len__(self):
+        return self._size
+
+
+class Calibration(ABC):
+    """
+    The Calibration class is the base of the calibration curves, which
+    give the base 10 logarithm of the molecular weight at any
+    retention time. Each curve has a key identifying it, so that the
+    molecular weight axis is only calculated once per curve and set of
+    retention times, and can be stored as a dictionary with a format
+    version so that saved curves are read back correctly. Subclasses
+    provide log_weights and to_dict
+    """
+    key = None
+
+
+    @abstractmethod
+    def log_weights(self, times):
+        """
+        A method that returns the base 10 logarithm of the molecular
+        weight at each retention time
+
+        Parameters
+        ----------
+        times : 1darray
+            The retention times
+
+        Returns
+        -------
+        log_weights : 1darray
+            The logarithm of the molecular weight at each time
+        """
+
+
+    @abstractmethod
+    def to_dict(self):
+        """
+        A method that returns the calibration curve as a dictionary of
+        built in types, which can be stored as JSON and read back with
+        calibration_from_dict
+
+        Returns
+        -------
+        data : dict
+            The calibration curve
+        """
+
+
+    def axis(self, times, fingerprint=None):
+        """
+        A method that returns the molecular weight axis of a set of
+        retention times, reusing the axis computed earlier for the same
+        calibration curve and retention times
+
+        Parameters
+        ----------
+        times : 1darray
+            The retention times
+        fingerprint : tuple
+            The grid_fingerprint of the retention times, computed if
+            it is not given
+
+        Returns
+        -------
+        axis : CalibrationAxis
+            The calibrated molecular weight axis
+        """
+        return calibration_axis(self, times, fingerprint)
+
+
+class PolynomialCalibration(Calibration):
+    def __init__(self, coefficients, standards=None):
+        """
+        The PolynomialCalibration class is a calibration curve where
+        the logarithm of the molecular weight is a polynomial of the
+        retention time
+
+        Parameters
+        ----------
+        coefficients : list
+            The coefficients of the polynomial, from the highest power
+            of the retention time to the constant term
+        standards : tuple
+            The retention times and peak molecular weights of the
+            standards the curve was fitted to, if any
+
+        Attributes
+        ----------
+        key : tuple
+            A value identifying the calibration curve, equal for equal
+            curves
+        """
+        self.coefficients = tuple(float(value) for value in coefficients)
+        self.standards = None
+        if standards is not None:
+            self.standards = tuple(
+                tuple(float(value) for value in values)
+                for values in standards
+            )
+        self.key = ('polynomial', self.coefficients)
+
+
+    @classmethod
+    def fit(cls, times, weights, order=1):
+        """
+        A method that fits the calibration curve to a set of standards
+        by least squares
+
+        Parameters
+        ----------
+        times : 1darray
+            The retention time of the peak of each standard
+        weights : 1darray
+            The peak molecular weight, Mp, of each standard
+        order : int
+            The order of the polynomial, from 1 to MAX_ORDER
+
+        Returns
+        -------
+        calibration : PolynomialCalibration
+            The fitted calibration curve
+        """
+        times = np.asarray(times, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        if not 1 <= order <= MAX_ORDER:
+            raise ValueError(f'The order must be between 1 and {MAX_ORDER}')
+        if len(times) != len(weights):
+            raise ValueError('Every standard needs a time and a weight')
+        if len(np.unique(times)) <= order:
+            raise ValueError(f'An order {order} calibration requires at '
+                             f'least {order + 1} standards')
+        if np.any(weights <= 0):
+            raise ValueError('The molecular weights must be positive')
+
+        coefficients = np.polyfit(times, np.log10(weights), order)
+        return cls(coefficients, standards=(times, weights))
+
+
+    def fit_error(self):
+        """
+        A method that returns the root mean square difference between
+        the logarithm of the molecular weight of the standards and the
+        curve
+
+        Returns
+        -------
+        error : float
+            The error of the fit, or None if the curve was not fitted
+            to standards
+        """
+        if self.standards is None:
+            return None
+        times, weights = self.standards
+        residuals = self.log_weights(np.array(times)) - np.log10(weights)
+        return float(np.sqrt(np.mean(residuals**2)))
+
+
+    def log_weights(self, times):
+        return np.polyval(self.coefficients, times)
+
+
+    def to_dict(self):
+        data = {
+            'format': FORMAT_VERSION,
+            'type': 'polynomial',
+            'coefficients': list(self.coefficients)
+        }
+        if self.standards is not None:
+            data['standards'] = [list(values) for values in self.standards]
+        return data
+
+
+class UniversalCalibration(Calibration):
+    def __init__(self, reference, standard_constants, sample_constants):
+        """
+        The UniversalCalibration class is a calibration curve for a
+        polymer other than the standards, found from the calibration of
+        the standards and the Mark-Houwink constants of both polymers,
+        since both elute at the same hydrodynamic volume [n]M, with the
+        intrinsic viscosity [n] = KM^a
+
+        Parameters
+        ----------
+        reference : PolynomialCalibration
+            The calibration curve of the standards
+        standard_constants : tuple
+            The Mark-Houwink K and a of the standards
+        sample_constants : tuple
+            The Mark-Houwink K and a of the sample
+
+        Attributes
+        ----------
+        key : tuple
+            A value identifying the calibration curve, equal for equal
+            curves
+        """
+        self.reference = reference
+        self.standard_constants = tuple(float(value)
+                                        for value in standard_constants)
+        self.sample_constants = tuple(float(value)
+                                      for value in sample_constants)
+        for k, a in (self.standard_constants, self.sample_constants):
+            if k <= 0 or a <= -1:
+                raise ValueError('The Mark-Houwink K must be positive and '
+                                 'a must be greater than -1')
+        self.key = ('universal', reference.key, self.standard_constants,
+                    self.sample_constants)
+
+
+    def log_weights(self, times):
+        # log M = (log(Ks/K) + (1+as) log Ms)/(1+a), where the s
+        # subscript denotes the standards
+        k_standard, a_standard = self.standard_constants
+        k_sample, a_sample = self.sample_constants
+        return ((np.log10(k_standard/k_sample) +
+                 (1 + a_standard)*self.reference.log_weights(times)) /
+                (1 + a_sample))
+
+
+    def to_dict(self):
+        return {
+            'format': FORMAT_VERSION,
+            'type': 'universal',
+            'reference': self.reference.to_dict(),
+            'standard_constants': list(self.standard_constants),
+            'sample_constants': list(self.sample_constants)
+        }
+
+
+def make_calibration(params, method='linear'):
+    """
+    Creates a calibration curve from named parameters
+
+    Parameters
+    ----------
+    params : dict
+        A dictionary containing the parameters of the calibration
+        curve, named as in CALIBRATION_PARAMS
+    method : string
+        The calibration method
+            linear : log10(mw)=at+b
+            cubic : log10(mw)=at^3+bt^2+ct+d
+
+    Returns
+    -------
+    calibration : PolynomialCalibration
+        The calibration curve
+    """
+    if method not in CALIBRATION_PARAMS:
+        raise ValueError(f'Unknown calibration method: {method}')
+    return PolynomialCalibration(
+        [params[name] for name in CALIBRATION_PARAMS[method]]
+    )
+
+
+def calibration_from_dict(data):
+    """
+    Creates a calibration curve from a dictionary made by its to_dict
+    method
+
+    Parameters
+    ----------
+    data : dict
+        The stored calibration curve
+
+    Returns
+    -------
+    calibration : Calibration
+        The calibration curve
+    """
+    if data.get('format', 0) > FORMAT_VERSION:
+        raise ValueError('The calibration was saved by a newer version')
+
+    if data['type'] == 'polynomial':
+        return PolynomialCalibration(data['coefficients'],
+                                     data.get('standards'))
+    if data['type'] == 'universal':
+        return UniversalCalibration(
+            calibration_from_dict(data['reference']),
+            data['standard_constants'], data['sample_constants']
+        )
+    raise ValueError(f'Unknown calibration type: {data["type"]}')
+
+
+def calibration_axis(calibration, times, fingerprint=None):
+    """
+    Returns the molecular weight axis of a calibration curve over a
+    set of retention times from a cache shared by every object
+
+    Parameters
+    ----------
+    calibration : Calibration
+        The calibration curve
+    times : 1darray
+        The retention times
+    fingerprint : tuple
+        The grid_fingerprint of the retention times, computed if it is
+        not given
+
+    Returns
+    -------
+    axis : CalibrationAxis
+        The calibrated molecular weight axis
+    """
+    if fingerprint is None:
+        fingerprint = grid_fingerprint(times)
+
+    key = (calibration.key, fingerprint)
+    with _axes_lock:
+        axis = _axes.get(key)
+        if axis is not None:
+            _axes.move_to_end(key)
+            return axis
+
+    # The axis is built without holding the lock; if another thread
+    # built the same axis meanwhile, the axis built first is kept
+    axis = CalibrationAxis(10**calibration.log_weights(times))
+    with _axes_lock:
+        axis = _axes.setdefault(key, axis)
+        _axes.move_to_end(key)
+        while len(_axes) > MAX_CACHED_AXES:
+            _axes.popitem(last=False)
+    return axis
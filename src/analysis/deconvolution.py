@@ -0,0 +1,628 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+import numpy as np
+
+from analysis.workers import process_pool
+
+# The residuals of a fit lying above the measured trace are multiplied
+# by this factor so that the fitted peaks do not overshoot the trace
+PENALTY = 10
+
+# The range of dispersities allowed for each fitted peak
+DISPERSITY_BOUNDS = (1.0, 3.0)
+
+# The number of standard deviations from its center, in the logarithm
+# of the molecular weight, beyond which a peak falls below 1e-12 of its
+# height and is treated as zero
+SUPPORT_SIGMAS = np.sqrt(-2*np.log(1e-12))
+
+
+def gaussian(mws, mn, d):
+    """
+    Calculates a log-normal molecular weight distribution with unit
+    area in the logarithm of the molecular weight
+
+    Parameters
+    ----------
+    mws : 1darray
+        The molecular weights at which to evaluate the distribution
+    mn : float or 1darray
+        The number average molecular weight of the distribution, or
+        of several distributions
+    d : float or 1darray
+        The dispersity of the distribution, or of several
+        distributions
+
+    Returns
+    -------
+    distribution : 1darray or 2darray
+        The value of the distribution at each molecular weight, with
+        one column per distribution if several were given
+    """
+    distribution, _, _ = _log_normal(np.log(mws), np.atleast_1d(mn),
+                                     np.atleast_1d(d))
+    return distribution[0] if np.ndim(mn) == 0 else distribution.T
+
+
+def _log_normal(log_mws, mns, ds):
+    # Evaluates every distribution in one broadcast, with one row per
+    # peak so that the innermost loop of each operation runs over the
+    # points, and also returns the terms reused by the jacobian. The
+    # operations are done in place since every temporary array is as
+    # large as the result
+    variance = np.log(ds)[:, None]
+    offset = log_mws - (np.log(mns)[:, None] - variance)
+    distribution = np.square(offset)
+    distribution *= -0.5/variance
+    distribution -= 0.5*np.log(2*np.pi*variance)
+    np.exp(distribution, out=distribution)
+    return distribution, offset, variance
+
+
+def peak_components(params, mws):
+    """
+    Calculates each of the fitted peaks
+
+    Parameters
+    ----------
+    params : 1darray
+        The Mn, dispersity and weight of each peak in turn
+    mws : 1darray
+        The molecular weights at which to evaluate the peaks
+
+    Returns
+    -------
+    components : 2darray
+        A 2D numpy array with each peak per column
+    """
+    return params[2::3]*gaussian(mws, params[::3], params[1::3])
+
+
+class SparsePeaks:
+    def __init__(self, params, mws):
+        """
+        The SparsePeaks class holds fitted peaks evaluated only over
+        their significant support, with each peak stored as the offset
+        of its first point within the molecular weights and its values
+        from there on. The dense peaks are only built on demand
+
+        Parameters
+        ----------
+        params : 1darray
+            The Mn, dispersity and weight of each peak in turn
+        mws : 1darray
+            The monotonic molecular weights at which the peaks are
+            evaluated
+
+        Attributes
+        ----------
+        x : 1darray
+            The molecular weights at which the peaks are evaluated
+        offsets : 1darray
+            The index of the first evaluated point of each peak
+        values : list
+            The values of each peak over its support
+        """
+        self.x = mws
+        self.offsets = np.zeros(len(params) // 3, dtype=int)
+        self.values = []
+
+        decreasing = len(mws) > 1 and mws[0] > mws[-1]
+        search = mws[::-1] if decreasing else mws
+        for i, (mn, d, weight) in enumerate(np.reshape(params, (-1, 3))):
+            variance = np.log(d)
+            center = np.log(mn) - variance
+            half_width = SUPPORT_SIGMAS*np.sqrt(variance)
+            start = np.searchsorted(search, np.exp(center - half_width))
+            stop = np.searchsorted(search, np.exp(center + half_width),
+                                   side='right')
+            if decreasing:
+                start, stop = len(mws) - stop, len(mws) - start
+
+            distribution, _, _ = _log_normal(
+                np.log(mws[start:stop]), np.array([mn]), np.array([d])
+            )
+            self.offsets[i] = start
+            self.values.append(weight*distribution[0])
+
+
+    @property
+    def nbytes(self):
+        return self.offsets.nbytes + sum(value.nbytes for value in self.values)
+
+
+    def segments(self):
+        """
+        A method that returns the molecular weights and values of each
+        peak over its support, such as for plotting
+
+        Returns
+        -------
+        segments : list
+            A list with a tuple of the molecular weights and the values
+            of each peak
+        """
+        return [(self.x[offset:offset + len(value)], value)
+                for offset, value in zip(self.offsets, self.values)]
+
+
+    def toarray(self):
+        """
+        A method that expands the peaks over every molecular weight
+
+        Returns
+        -------
+        peaks : 2darray
+            A 2D numpy array with each peak per column
+        """
+        peaks = np.zeros((len(self.x), len(self.values)))
+        for i, (offset, value) in enumerate(zip(self.offsets, self.values)):
+            peaks[offset:offset + len(value), i] = value
+        return peaks
+
+
+    def __len__(self):
+        """
+        A method that returns how many peaks are held
+
+        Returns
+        -------
+        length : int
+            The number of peaks
+        """
+        return len(self.values)
+
+
+class PeakModel:
+    def __init__(self, mws, trace, penalty=PENALTY):
+        """
+        The PeakModel class provides the residuals of a sum of peaks
+        against a measured trace, and their analytic jacobian, for
+        least_squares. The params hold the Mn, dispersity and weight
+        of each peak in turn, and the peaks are evaluated for the last
+        params so that the jacobian reuses the evaluation made for the
+        residuals at the same point
+
+        Parameters
+        ----------
+        mws : 1darray
+            The molecular weights of the points of the trace
+        trace : 1darray
+            The measured trace
+        penalty : float
+            The factor applied to the residuals above the trace, so
+            that the fitted peaks do not overshoot the trace
+        """
+        self.log_mws = np.log(mws)
+        self.trace = trace
+        self.penalty = penalty
+        self._params = None
+        self._evaluation = None
+
+
+    def _evaluate(self, params):
+        # Evaluates the peaks, reusing the previous evaluation when the
+        # params are unchanged
+        if self._params is None or not np.array_equal(params, self._params):
+            distribution, offset, variance = _log_normal(
+                self.log_mws, params[::3], params[1::3]
+            )
+            difference = params[2::3] @ distribution - self.trace
+            self._params = params.copy()
+            self._evaluation = (distribution, offset, variance, difference)
+        return self._evaluation
+
+
+    def residuals(self, params):
+        """
+        A method that returns the penalized difference between the sum
+        of the peaks and the trace
+
+        Parameters
+        ----------
+        params : 1darray
+            The Mn, dispersity and weight of each peak
+
+        Returns
+        -------
+        residuals : 1darray
+            The residual of each point
+        """
+        calc_resids = self._evaluate(params)[3].copy()
+        calc_resids[calc_resids>0] *= self.penalty
+        return calc_resids
+
+
+    def jacobian(self, params):
+        """
+        A method that returns the derivatives of the residuals with
+        respect to the Mn, dispersity and weight of each peak
+
+        Parameters
+        ----------
+        params : 1darray
+            The Mn, dispersity and weight of each peak
+
+        Returns
+        -------
+        jacobian : 2darray
+            The derivative of each residual per row with respect to
+            each parameter per column
+        """
+        distribution, offset, variance, difference = self._evaluate(params)
+        mns, ds, weights = params[::3], params[1::3], params[2::3]
+
+        # With u the offset from the center in log space, s^2 the
+        # variance ln(D) and g the distribution, dg/dMn = g u/(s^2 Mn)
+        # and dg/dD = g (u^2/(2s^2) - u - 1/2)/(s^2 D). The derivatives
+        # are built with one row per parameter and then transposed
+        weighted = weights[:, None]*distribution
+        jac = np.empty((len(mns), 3, len(self.trace)))
+        np.multiply(weighted, offset, out=jac[:, 0])
+        jac[:, 0] /= variance*mns[:, None]
+        np.multiply(offset, offset/(2*variance) - 1, out=jac[:, 1])
+        jac[:, 1] -= 0.5
+        jac[:, 1] *= weighted/(variance*ds[:, None])
+        jac[:, 2] = distribution
+        jac = jac.reshape(len(params), -1)
+
+        # The residuals above the trace carry the penalty
+        jac[:, difference>0] *= self.penalty
+        return jac.T
+
+
+def fit_bounds(peaks, lbound, rbound):
+    """
+    Returns the bounds of the Mn, dispersity and weight of each peak
+
+    Parameters
+    ----------
+    peaks : int
+        The number of peaks
+    lbound : float
+        The lower molecular weight bound of the fit
+    rbound : float
+        The upper molecular weight bound of the fit
+
+    Returns
+    -------
+    bounds : tuple
+        The lower and upper bounds of every parameter
+    """
+    lower = [lbound, DISPERSITY_BOUNDS[0], 0]*peaks
+    upper = [rbound, DISPERSITY_BOUNDS[1], np.inf]*peaks
+    return (np.array(lower, dtype=float), np.array(upper, dtype=float))
+
+
+def initial_guesses(mws, trace, peaks, lbound, rbound, starts, seed=0):
+    """
+    Returns the initial guesses from which the fit is started. The
+    first guess places every peak at the geometric mean of the bounds,
+    the second places the peaks on the highest local maxima of the
+    trace and the rest pick random maxima and positions between the
+    bounds
+
+    Parameters
+    ----------
+    mws : 1darray
+        The molecular weights of the points of the trace
+    trace : 1darray
+        The measured trace
+    peaks : int
+        The number of peaks
+    lbound : float
+        The lower molecular weight bound of the fit
+    rbound : float
+        The upper molecular weight bound of the fit
+    starts : int
+        The number of initial guesses
+    seed : int
+        The seed of the random guesses, so that the fit is repeatable
+
+    Returns
+    -------
+    guesses : list
+        A list of the initial parameters of each start
+    """
+    guesses = [np.array(
+        [np.exp((np.log(lbound)+np.log(rbound))/2), 1.1, 1.0]*peaks
+    )]
+    if starts <= 1 or len(trace) < 3:
+        return guesses[:max(starts, 1)]
+
+    # The local maxima of the trace, highest first, are the most
+    # likely positions of the peaks
+    interior = trace[1:-1]
+    maxima = np.flatnonzero((interior > trace[:-2]) &
+                            (interior >= trace[2:])) + 1
+    maxima = maxima[np.argsort(trace[maxima])[::-1]]
+
+    rng = np.random.default_rng(seed)
+    log_bounds = np.log((lbound, rbound))
+    for start in range(1, starts):
+        if start == 1:
+            positions = list(mws[maxima[:peaks]])
+            dispersities = np.full(peaks, 1.1)
+        else:
+            candidates = rng.permutation(maxima)[:peaks]
+            positions = list(mws[candidates]*np.exp(
+                rng.normal(0, 0.1, len(candidates))
+            ))
+            dispersities = rng.uniform(1.02, 1.5, peaks)
+
+        # Peaks without a maximum to start from are spread randomly
+        # between the bounds
+        while len(positions) < peaks:
+            positions.append(np.exp(rng.uniform(*log_bounds)))
+
+        guess = []
+        for position, dispersity in zip(positions, dispersities):
+            # The distribution peaks at Mn/D, and its weight is chosen
+            # so that it matches the height of the trace there
+            mn = np.clip(position*dispersity, lbound, rbound)
+            sigma = np.sqrt(np.log(dispersity))
+            height = np.interp(
+                np.log(mn/dispersity), np.log(mws[::-1]), trace[::-1]
+            )
+            weight = max(height, 0)*sigma*np.sqrt(2*np.pi)
+            guess.extend((mn, dispersity, weight))
+        guesses.append(np.array(guess))
+
+    return guesses
+
+
+class _DeadlineReached(Exception):
+    # Raised within a fit to stop it once its time budget is spent
+    pass
+
+
+def fit_start(mws, trace, bounds, guess, max_nfev=None, deadline=None):
+    """
+    Fits the peaks to a trace from a single initial guess; module
+    level so it can be sent to a worker process
+
+    Parameters
+    ----------
+    mws : 1darray
+        The molecular weights of the points of the trace
+    trace : 1darray
+        The measured trace
+    bounds : tuple
+        The lower and upper bounds of every parameter
+    guess : 1darray
+        The initial parameters
+    max_nfev : int
+        The maximum number of evaluations of the residuals, or None
+        for the default of least_squares
+    deadline : float
+        The time, as given by time.time, at which the fit stops at its
+        next evaluation of the residuals and returns the best
+        parameters evaluated so far; the residuals are always
+        evaluated at least once
+
+    Returns
+    -------
+    cost : float
+        Half the sum of the squared residuals of the fit
+    params : 1darray
+        The fitted parameters
+    """
+    # scipy is imported on first use so that importing the analysis
+    # package stays fast for scripting and batch processing
+    from scipy.optimize import least_squares
+
+    # The Mn are several orders of magnitude larger than the
+    # dispersities and weights, so the steps are scaled by the columns
+    # of the jacobian; unscaled fits stop on the step tolerance well
+    # short of the minimum once there are more than a few peaks
+    model = PeakModel(mws, trace)
+    if deadline is None:
+        res = least_squares(model.residuals, guess, jac=model.jacobian,
+                            bounds=bounds, x_scale='jac', max_nfev=max_nfev)
+        return res['cost'], res['x']
+
+    # The wall clock is used since the deadline is shared between
+    # processes. The best point is tracked so that a fit stopped part
+    # way still returns the best parameters it reached
+    best = [np.inf, guess]
+    def residuals(params):
+        if best[0] < np.inf and time.time() > deadline:
+            raise _DeadlineReached
+        calc_resids = model.residuals(params)
+        cost = 0.5*np.dot(calc_resids, calc_resids)
+        if cost < best[0]:
+            best[:] = cost, params.copy()
+        return calc_resids
+
+    try:
+        res = least_squares(residuals, guess, jac=model.jacobian,
+                            bounds=bounds, x_scale='jac', max_nfev=max_nfev)
+    except _DeadlineReached:
+        return best[0], best[1]
+    return res['cost'], res['x']
+
+
+def fit_peaks(mws, trace, peaks, lbound, rbound, starts=1, workers=None,
+              max_time=None, max_nfev=None, guess=None):
+    """
+    Fits a sum of peaks to a trace from several initial guesses and
+    returns the best fit
+
+    Parameters
+    ----------
+    mws : 1darray
+        The molecular weights of the points of the trace
+    trace : 1darray
+        The measured trace
+    peaks : int
+        The number of peaks
+    lbound : float
+        The lower molecular weight bound of the fit
+    rbound : float
+        The upper molecular weight bound of the fit
+    starts : int
+        The number of initial guesses the fit is started from
+    workers : int
+        The maximum number of processes fitting the starts in
+        parallel, defaults to the number of processors
+    max_time : float
+        The time in seconds after which no further starts are begun
+        and the running starts stop at their next evaluation of the
+        residuals, keeping the best parameters they reached; the best
+        fit found is returned
+    max_nfev : int
+        The maximum number of evaluations of the residuals for each
+        start
+    guess : 1darray
+        The parameters of a previous fit, such as that of a similar
+        trace, used in place of the first initial guess
+
+    Returns
+    -------
+    params : 1darray
+        The Mn, dispersity and weight of each peak in turn
+    """
+    deadline = None if max_time is None else time.time() + max_time
+    bounds = fit_bounds(peaks, lbound, rbound)
+    guesses = initial_guesses(mws, trace, peaks, lbound, rbound, starts)
+    if guess is not None:
+        guesses[0] = np.clip(guess, *bounds)
+
+    workers = min(workers or os.cpu_count() or 1, len(guesses))
+    if workers <= 1:
+        fits = []
+        for guess in guesses:
+            if fits and deadline is not None and time.time() > deadline:
+                break
+            fits.append(fit_start(mws, trace, bounds, guess, max_nfev,
+                                  deadline))
+    else:
+        fits = _fit_parallel(mws, trace, bounds, guesses, workers,
+                             deadline, max_nfev)
+
+    _, params = min(fits, key=lambda fit: fit[0])
+    return params
+
+
+def fit_traces(mws, traces, peaks, lbound, rbound, starts=1, workers=None,
+               max_time=None, max_nfev=None):
+    """
+    Fits the same number of peaks to several traces. The traces are
+    split into one contiguous block per worker process and, within a
+    block, each fit starts from the solution of the previous trace,
+    which is usually close for the runs of a sequence. When there are
+    fewer traces than workers, as for a single trace, the workers are
+    given to the starts of each fit instead
+
+    Parameters
+    ----------
+    mws : 1darray
+        The molecular weights of the points of the traces
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    peaks : int
+        The number of peaks
+    lbound : float
+        The lower molecular weight bound of the fit
+    rbound : float
+        The upper molecular weight bound of the fit
+    starts : int
+        The number of initial guesses each fit is started from
+    workers : int
+        The maximum number of processes fitting the traces in
+        parallel, defaults to the number of processors
+    max_time : float
+        The time in seconds that the starts of each fit may take,
+        after which the fit returns the best parameters reached
+    max_nfev : int
+        The maximum number of evaluations of the residuals for each
+        start
+
+    Returns
+    -------
+    params : 2darray
+        The Mn, dispersity and weight of each peak in turn, with one
+        row per trace
+    """
+    num_traces = traces.shape[1]
+    options = (peaks, lbound, rbound, starts, max_time, max_nfev)
+    workers = workers or os.cpu_count() or 1
+    if min(workers, num_traces) <= 1:
+        return _fit_trace_block(mws, traces, *options, workers=workers)
+
+    blocks = np.array_split(np.arange(num_traces), min(workers, num_traces))
+    executor = process_pool()
+    results = [
+        executor.submit(_fit_trace_block, mws,
+                        np.ascontiguousarray(traces[:, block]), *options)
+        for block in blocks
+    ]
+    return np.concatenate([result.result() for result in results])
+
+
+def _fit_trace_block(mws, traces, peaks, lbound, rbound, starts, max_time,
+                     max_nfev, workers=1):
+    # Fits a block of traces in turn, warm starting each fit from the
+    # previous one; module level so it can be sent to a worker process,
+    # where the starts of each fit are run one after the other
+    params = np.empty((traces.shape[1], 3*peaks))
+    guess = None
+    for i in range(traces.shape[1]):
+        params[i] = fit_peaks(mws, traces[:, i], peaks, lbound, rbound,
+                              starts=starts, workers=workers, max_time=max_time,
+                              max_nfev=max_nfev, guess=guess)
+        guess = params[i]
+    return params
+
+
+def peak_summary(params):
+    """
+    Calculates the Mn, Mw, dispersity and area of each fitted peak
+
+    Parameters
+    ----------
+    params : 1darray or 2darray
+        The Mn, dispersity and weight of each peak in turn, or a 2D
+        numpy array with the parameters of one fit per row
+
+    Returns
+    -------
+    summary : dict
+        A dictionary with the keys 'mns', 'mws', 'disp' and 'areas',
+        where the areas are normalized to 100 for each fit
+    """
+    mns = params[..., ::3]
+    disp = params[..., 1::3]
+    weights = params[..., 2::3]
+    return {
+        'mns': mns,
+        'mws': mns*disp,
+        'disp': disp,
+        'areas': 100 * weights / np.sum(weights, axis=-1, keepdims=True)
+    }
+
+
+def _fit_parallel(mws, trace, bounds, guesses, workers, deadline,
+                  max_nfev):
+    # Fits the starts on the shared process pool, with at most workers
+    # starts running at once. No start is begun after the deadline and
+    # the running starts stop by themselves once it passes, so no work
+    # is left running on the pool when the fit returns
+    executor = process_pool()
+    remaining = list(guesses)
+    pending = set()
+    fits = []
+    while remaining or pending:
+        while (remaining and len(pending) < workers and
+               (deadline is None or time.time() < deadline or
+                not (fits or pending))):
+            pending.add(executor.submit(
+                fit_start, mws, trace, bounds, remaining.pop(0), max_nfev,
+                deadline
+            ))
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        fits.extend(future.result() for future in done)
+    return fits
@@ -0,0 +1,89 @@
+import io
+import numpy as np
+
+# The Tosoh EcoSEC software writes two header lines before the data,
+# the first naming the result and detector and the second labelling
+# each column as either X: (retention time) or Y: (intensity)
+HEADER_LINES = 2
+
+
+def read_ecosec(data_filename):
+    """
+    Reads a text file exported from the Tosoh EcoSEC software and
+    returns the retention times and the intensities of each trace
+
+    Parameters
+    ----------
+    data_filename : string
+        A string with the filename of a .txt or .csv file that
+        contains the experimental data
+
+    Returns
+    -------
+    retention_times : 1darray
+        A 1D numpy array containing the retention times at which the
+        intensities are measured
+    traces : 2darray
+        A 2D numpy array containing one intensity column per trace
+    """
+    with open(data_filename, 'rb') as data_file:
+        raw = data_file.read()
+
+    # Splitting the header from the body in a single pass so that the
+    # data only needs to be read from disk once
+    sections = raw.split(b'\n', HEADER_LINES)
+    if len(sections) <= HEADER_LINES:
+        raise ValueError(
+            f'{data_filename} is missing the EcoSEC header or data'
+        )
+    labels = sections[1].split()
+    _check_header(labels, data_filename)
+
+    # np.loadtxt parses the whole body in its C engine, which is an
+    # order of magnitude faster than np.genfromtxt; latin-1 maps every
+    # byte so stray characters surface as a parsing error, not an
+    # encoding one
+    body = io.StringIO(sections[HEADER_LINES].decode('latin-1'))
+    try:
+        raw_traces = np.loadtxt(body, ndmin=2)
+    except ValueError as e:
+        raise ValueError(
+            f'{data_filename} does not contain EcoSEC data: {e}'
+        ) from None
+
+    if raw_traces.shape[0] == 0:
+        raise ValueError(f'{data_filename} does not contain any data')
+    if raw_traces.shape[1] != len(labels):
+        raise ValueError(
+            f'{data_filename} has {raw_traces.shape[1]} data columns '
+            f'but {len(labels)} header columns'
+        )
+
+    # The Tosoh EcoSEC HPLC8320-GPC measures the response of its
+    # detectors at a fixed frequency which remains unchanged, so only
+    # the first retention time column is kept
+    return raw_traces[:, 0].copy(), np.ascontiguousarray(raw_traces[:, 1::2])
+
+
+def _check_header(labels, data_filename):
+    """
+    Confirms that the column labels alternate between retention time
+    and intensity columns
+
+    Parameters
+    ----------
+    labels : list
+        The column labels from the second header line, as bytes
+    data_filename : string
+        The name of the file being read, used in error messages
+    """
+    if len(labels) == 0 or len(labels) % 2 != 0:
+        raise ValueError(
+            f'{data_filename} must contain alternating X: and Y: columns'
+        )
+
+    if (any(label != b'X:' for label in labels[::2]) or
+        any(label != b'Y:' for label in labels[1::2])):
+        raise ValueError(
+            f'{data_filename} must contain alternating X: and Y: columns'
+        )
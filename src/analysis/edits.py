@@ -0,0 +1,74 @@
+import numpy as np
+
+
+class EditedTraces:
+    def __init__(self, raw_traces, baselines, scales, dtype=np.float64):
+        """
+        The EditedTraces class is a read only view of edited traces
+        composed from layers of edits on top of the raw traces; each
+        trace is its raw values less its baseline, multiplied by its
+        scale factor. Nothing is calculated until the view is indexed,
+        and then only for the selected points and traces
+
+        Parameters
+        ----------
+        raw_traces : 2darray
+            A 2D numpy array with one raw trace per column
+        baselines : 2darray
+            A 2D numpy array with the baseline subtracted from each
+            trace per column, or None if no baseline is subtracted
+        scales : 1darray
+            The factor by which each trace is multiplied
+        dtype : dtype
+            The data type of the edited values
+
+        Attributes
+        ----------
+        shape : tuple
+            The number of points and the number of traces
+        dtype : dtype
+            The data type of the edited values
+        """
+        self._raw = raw_traces
+        self._baselines = baselines
+        self._scales = scales
+        self.dtype = np.dtype(dtype)
+        self.shape = raw_traces.shape
+        self.ndim = 2
+
+
+    def __getitem__(self, key):
+        """
+        A method that calculates the edited values of a selection of
+        points and traces, indexed as a 2D numpy array
+
+        Parameters
+        ----------
+        key : tuple
+            The index of the points and of the traces
+
+        Returns
+        -------
+        values : ndarray or float
+            A new array with the edited values of the selection
+        """
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) == 1:
+            key = key + (slice(None),)
+        rows, columns = key
+
+        values = np.array(self._raw[rows, columns], dtype=self.dtype)
+        if self._baselines is not None:
+            values -= self._baselines[rows, columns]
+        values *= self._scales[columns]
+        return values[()]
+
+
+    def __array__(self, dtype=None, copy=None):
+        values = self[:, :]
+        return values if dtype is None else values.astype(dtype)
+
+
+    def __len__(self):
+        return self.shape[0]
@@ -0,0 +1,91 @@
+import hashlib
+import numpy as np
+
+
+def grid_fingerprint(times):
+    """
+    Returns a fingerprint of a set of retention times so that two
+    grids can be compared without comparing every point
+
+    Parameters
+    ----------
+    times : 1darray
+        The retention times of the grid
+
+    Returns
+    -------
+    fingerprint : tuple
+        The number of points of the grid and a digest of its values
+    """
+    times = np.ascontiguousarray(times, dtype=np.float64)
+    digest = hashlib.blake2b(times.tobytes(), digest_size=16).hexdigest()
+    return (len(times), digest)
+
+
+def resample_traces(times, traces, new_times):
+    """
+    Linearly interpolates every trace onto a new set of retention
+    times in a single vectorized operation; points outside of the
+    measured range take the value of the nearest measured point, as
+    with np.interp
+
+    Parameters
+    ----------
+    times : 1darray
+        The monotonically increasing retention times at which the
+        traces were measured
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    new_times : 1darray
+        The retention times onto which the traces are resampled
+
+    Returns
+    -------
+    new_traces : 2darray
+        A 2D numpy array with one resampled trace per column
+    """
+    times = np.asarray(times, dtype=np.float64)
+    new_times = np.asarray(new_times, dtype=np.float64)
+    if len(times) < 2:
+        raise ValueError('At least two retention times are required to '
+                         'resample a trace')
+
+    # The interpolation indices and weights depend only on the grids
+    # so they are computed once and shared by every trace
+    right = np.clip(np.searchsorted(times, new_times), 1, len(times)-1)
+    left = right - 1
+    spacing = times[right] - times[left]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.where(spacing > 0,
+                           (new_times - times[left]) / spacing, 0.0)
+    weights = np.clip(weights, 0.0, 1.0)[:, None]
+
+    traces = np.asarray(traces)
+    return traces[left]*(1.0 - weights) + traces[right]*weights
+
+
+def grid_covers(times, new_times):
+    """
+    Checks whether a set of measured retention times spans a new grid,
+    so that resampling onto it does not extend the traces with the
+    value of their first or last point. A grid that ends within half
+    a sampling interval of the new one is still taken to cover it
+
+    Parameters
+    ----------
+    times : 1darray
+        The monotonically increasing retention times at which the
+        traces were measured
+    new_times : 1darray
+        The retention times onto which the traces are resampled
+
+    Returns
+    -------
+    covers : bool
+        Whether the measured times span the new grid
+    """
+    times = np.asarray(times, dtype=np.float64)
+    new_times = np.asarray(new_times, dtype=np.float64)
+    tolerance = 0.5*np.median(np.diff(times)) if len(times) > 1 else 0.0
+    return (times[0] - tolerance <= new_times[0] and
+            times[-1] + tolerance >= new_times[-1])
@@ -0,0 +1,140 @@
+import numpy as np
+
+# The normalization styles, those after the first three are given the
+# position at which, or the range over which, every trace is matched
+#     individual : the highest point of each trace is scaled to one
+#     global : the highest point of every trace is scaled to one
+#     area : the area of each trace is scaled to one
+#     point : every trace is given the same value at a position
+#     integral : every trace is given the same area over a range
+NORMALIZATION_STYLES = ('individual', 'global', 'area', 'point', 'integral')
+
+
+def parse_normalization(style, text=''):
+    """
+    Reads the position or range of a normalization style from text,
+    where a range is given as two values separated by a comma
+
+    Parameters
+    ----------
+    style : string
+        The normalization style, one of NORMALIZATION_STYLES
+    text : string
+        The text of the position or range, ignored by the styles that
+        do not use one
+
+    Returns
+    -------
+    position : float or tuple
+        The position of the point style, the lower and upper ends of
+        the range of the integral style, or None for the other styles
+    """
+    if style not in NORMALIZATION_STYLES:
+        raise ValueError(f'Unknown normalization: {style}')
+
+    if style == 'point':
+        try:
+            return float(text)
+        except ValueError:
+            raise ValueError('The point normalization requires a position')
+    if style == 'integral':
+        try:
+            lower, upper = (float(value) for value in text.split(','))
+        except ValueError:
+            raise ValueError('The integral normalization requires a range '
+                             'given as "lower, upper"')
+        return (min(lower, upper), max(lower, upper))
+    return None
+
+
+def trace_heights(traces, scales):
+    """
+    Calculates the highest point of each trace once it is multiplied
+    by its scale factor, without multiplying the traces
+
+    Parameters
+    ----------
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    scales : 1darray
+        The factor by which each trace is multiplied
+
+    Returns
+    -------
+    heights : 1darray
+        The highest point of each scaled trace
+    """
+    # A negative scale factor turns the lowest point into the highest
+    return np.where(scales >= 0, scales*np.max(traces, axis=0),
+                    scales*np.min(traces, axis=0))
+
+
+def trace_values(traces, scales, fraction):
+    """
+    Calculates the value of each scaled trace between two neighbouring
+    points, linearly interpolated between them
+
+    Parameters
+    ----------
+    traces : 2darray
+        A 2D numpy array with the two neighbouring points of each
+        trace per column
+    scales : 1darray
+        The factor by which each trace is multiplied
+    fraction : float
+        The fraction of the distance from the first point to the
+        second
+
+    Returns
+    -------
+    values : 1darray
+        The interpolated value of each scaled trace
+    """
+    if len(traces) == 1:
+        return scales*traces[0]
+    return scales*((1 - fraction)*traces[0] + fraction*traces[1])
+
+
+def trace_integrals(traces, scales, weights):
+    """
+    Calculates the integral of each scaled trace as a single matrix
+    product with the weights of the integral
+
+    Parameters
+    ----------
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    scales : 1darray
+        The factor by which each trace is multiplied
+    weights : 1darray
+        The weight of each point in the integral, from
+        trapezoid_weights
+
+    Returns
+    -------
+    integrals : 1darray
+        The integral of each scaled trace
+    """
+    return scales*(weights @ traces)
+
+
+def trapezoid_weights(x):
+    """
+    Calculates the weight of each point in a trapezoidal integral so
+    that np.trapezoid(y, x) equals the dot product of the weights and y
+
+    Parameters
+    ----------
+    x : 1darray
+        The points at which the integrand is sampled
+
+    Returns
+    -------
+    weights : 1darray
+        The weight of each point
+    """
+    weights = np.zeros(len(x))
+    half_widths = np.diff(x)/2
+    weights[:-1] += half_widths
+    weights[1:] += half_widths
+    return weights
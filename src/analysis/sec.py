@@ -1,10 +1,32 @@
+from functools import partial
+import warnings
 import numpy as np
-from scipy.optimize import least_squares
-from pybaselines import Baseline
+
+from analysis.baseline import BaselineCache, fit_baselines
+from analysis.calibration import make_calibration
+from analysis.deconvolution import (SparsePeaks, fit_peaks, fit_traces,
+                                    peak_summary)
+from analysis.ecosec import read_ecosec
+from analysis.edits import EditedTraces
+from analysis.grid import grid_covers, grid_fingerprint, resample_traces
+from analysis.normalization import (NORMALIZATION_STYLES, trace_heights,
+                                    trace_integrals, trace_values,
+                                    trapezoid_weights)
+from analysis.store import MappedTraceStore, TraceStore
+
+# Once the traces of an object would use more memory than this they
+# are moved into memory-mapped files on disk, unless the storage was
+# chosen explicitly
+IN_MEMORY_BYTES = 512*1024**2
+
+# The memory used by the temporary arrays of the methods that process
+# the traces a block at a time is bounded by the size of a block
+BLOCK_BYTES = 64*1024**2
 
 
 class SEC:
-    def __init__(self, data_filename):
+    def __init__(self, data_filename, cache=None, out_of_core=None,
+                 storage_dir=None, dtype=np.float64, reader=read_ecosec):
         """
         The SEC class holds a set of traces generated by a size
         exclusion chromatograph and provides a number of methods to
@@ -15,15 +37,34 @@ class SEC:
         data_filename : string
             A string with the filename of a .txt or .csv file that
             contains the experimental data
+        cache : TraceCache
+            An optional cache from which previously imported files
+            are loaded instead of being parsed again
+        out_of_core : bool
+            Whether the traces are kept in memory-mapped files on disk
+            rather than in memory; by default they are moved to disk
+            once they would use more than IN_MEMORY_BYTES
+        storage_dir : string
+            The directory in which the memory-mapped files are
+            created, defaults to the temporary directory of the system
+        dtype : dtype
+            The data type of the edited traces and their baselines,
+            np.float32 halves the memory they use
+        reader : callable
+            The function that parses the file when it is not cached,
+            returning the retention times and the traces; it defaults
+            to read_ecosec and can hand the parsing to another process
         
         Attributes
         ----------
         gpc_traces : 2darray
             A 2D numpy array containing the intensities of the GPC
             chromatograms stored within the experiment file.
-        edited_traces : 2darray
-            A copy of the gpc_traces array in which data manipulation
-            occurs without modifying the original data
+        edited_traces : EditedTraces
+            A read only view of the traces after data manipulation,
+            composed from the gpc_traces array, the baseline and the
+            scale factor of each trace only for the points and traces
+            that are indexed, so the original data is not modified
         retention_times : 1darray
             A 1D numpy array containing the retention times at which
             the intensities are measured
@@ -32,25 +73,55 @@ class SEC:
         names : list
             A list of the name of each trace
         mol_weights : 1darray
-            A 1D numpy array containing the molecular weights,
-            calculated from calibration curve parameters
+            A read only 1D numpy array containing the molecular
+            weights, calculated from calibration curve parameters
+        calibration : Calibration
+            The calibration curve, or None before one is added
+        calibration_axis : CalibrationAxis
+            The molecular weight axis of the calibration curve, which
+            converts between molecular weights and positions
+        baseline_cache : BaselineCache
+            The baselines fitted for the traces, reused when the same
+            baseline correction is applied to unchanged traces
+        out_of_core : bool
+            Whether the traces are currently kept on disk
+        storage_dir : string
+            The directory in which the memory-mapped files are created
+        dtype : dtype
+            The data type of the edited traces
         """
-        # The skip_header=2 is inherent to the data files
-        # generated from the Tosoh EcoSEC software
-        raw_traces = np.genfromtxt(data_filename, skip_header=2)
-        
-        # The intensities are in every other column of the raw
-        # experimental text file, another feature specific to the
-        # Tosoh SEC data
-        self.gpc_traces = np.atleast_2d(raw_traces[:,1::2])
-        self.edited_traces = self.gpc_traces.copy()
-        
-        # The Tosoh EcoSEC HPLC8320-GPC measures the response of
-        # its detectors at a fixed frequency which remains
-        # unchanged, allowing us to represent the retention times
-        # using only the first column of the data file
-        self.retention_times = raw_traces[:,0]
-        self.mol_weights = None
+        # The Tosoh EcoSEC files contain a two line header followed
+        # by alternating retention time and intensity columns
+        if cache is None:
+            self.retention_times, traces = reader(data_filename)
+        else:
+            self.retention_times, traces = cache.load(data_filename, reader)
+        self.calibration = None
+        self.calibration_axis = None
+        self._grid = grid_fingerprint(self.retention_times)
+
+        # The traces are held in a growable store so that appending
+        # the traces of other files does not copy every trace each
+        # time. The edits are kept as layers on top of the raw traces,
+        # a baseline and a scale factor per trace, which are grown
+        # alongside the raw traces and only applied when the edited
+        # traces are read
+        self.storage_dir = storage_dir
+        self.dtype = np.dtype(dtype)
+        self._automatic_storage = out_of_core is None
+        self.out_of_core = bool(out_of_core or (
+            out_of_core is None and
+            traces.nbytes + traces.size*self.dtype.itemsize >
+            IN_MEMORY_BYTES
+        ))
+        self._raw_store = self._new_store(traces, copy=False)
+        self._baseline_store = None
+        self._scales = np.ones(traces.shape[1])
+        self._saved_edits = None
+
+        # Previously fitted baselines, so that regenerating a graph
+        # with the same baseline correction does not fit them again
+        self.baseline_cache = BaselineCache()
 
         # Pre-calculate length to avoid repeated shape calculations
         self._num_traces = self.gpc_traces.shape[1]
@@ -58,7 +129,82 @@ class SEC:
         # Aesthetic items
         self.colors = ['#000000'] * self._num_traces
         self.names = [f'Trace {i+1}' for i in range(self._num_traces)]
-        
+
+
+    @property
+    def gpc_traces(self):
+        return self._raw_store.array
+
+
+    @gpc_traces.setter
+    def gpc_traces(self, traces):
+        self._raw_store = self._new_store(traces, copy=False)
+
+
+    @property
+    def mol_weights(self):
+        if self.calibration_axis is None:
+            return None
+        return self.calibration_axis.mol_weights
+
+
+    @property
+    def edited_traces(self):
+        baselines = None
+        if self._baseline_store is not None:
+            baselines = self._baseline_store.array
+        return EditedTraces(self.gpc_traces, baselines, self._scales,
+                            self.dtype)
+
+
+    @edited_traces.setter
+    def edited_traces(self, traces):
+        # Edited traces set directly are stored as the baselines that
+        # turn the raw traces into them
+        baselines = self._zeros_store(len(self))
+        for block in self.trace_blocks():
+            baselines.array[:, block] = (self.gpc_traces[:, block] -
+                                         np.asarray(traces[:, block]))
+        self._baseline_store = baselines
+        self._scales = np.ones(len(self))
+
+
+    def _new_store(self, traces, copy=True):
+        # Creates a store of the kind currently used for the traces;
+        # a store on disk always holds its own copy of the traces
+        if self.out_of_core:
+            return MappedTraceStore(traces, self.storage_dir)
+        if copy:
+            traces = np.array(traces, order='F')
+        return TraceStore(traces)
+
+
+    def _zeros_store(self, count):
+        # Creates a store of the edited data type with traces of zeros
+        shape = (len(self.retention_times), count)
+        if self.out_of_core:
+            return MappedTraceStore.zeros(shape, self.dtype,
+                                          directory=self.storage_dir)
+        return TraceStore.zeros(shape, self.dtype)
+
+
+    def trace_blocks(self):
+        """
+        A method that splits the traces into contiguous blocks small
+        enough to be processed in memory, so that processing every
+        trace does not require temporary arrays the size of all of
+        the traces
+
+        Returns
+        -------
+        blocks : list
+            A list of slices selecting the traces of each block
+        """
+        points = max(len(self.retention_times), 1)
+        size = max(BLOCK_BYTES // (8*points), 1)
+        return [slice(start, min(start + size, len(self)))
+                for start in range(0, len(self), size)]
+
 
     def get_time_position(self, time=None):
         """
@@ -96,15 +242,10 @@ class SEC:
         index : int
             The index of the specified molecular weight
         """
-        # If the retention times are monotonically increasing as they
-        # should, then the molecular weights should be monotonically
-        # decreasing so they are negated to convert them into a
-        # monotonically increasing series
-        if weight is None or self.mol_weights is None:
+        if weight is None or self.calibration_axis is None:
             return None
         
-        index = np.searchsorted(self.mol_weights[::-1], weight)
-        return len(self.mol_weights) - index
+        return self.calibration_axis.position(weight)
     
 
     def add_calibration(self, params, method='linear'):
@@ -125,19 +266,25 @@ class SEC:
                         keys 'a', 'b', 'c', and 'd' where
                         log10(mw)=at^3+bt^2+ct+d
         """
-        if method=='linear':
-            self.mol_weights = (params['a'] * self.retention_times +
-                                params['b'])
-            
-        elif method=='cubic':
-            self.mol_weights = (params['a']*self.retention_times**3 +
-                                params['b']*self.retention_times**2 +
-                                params['c']*self.retention_times +
-                                params['d'])
-        else:
-            raise ValueError(f'Unknown calibration method: {method}')
+        self.set_calibration(make_calibration(params, method))
+
+
+    def set_calibration(self, calibration):
+        """
+        A method that sets the calibration curve from which the
+        molecular weights are calculated; the molecular weight axis is
+        shared with every other object using the same curve and
+        retention times, so it is only calculated once
 
-        self.mol_weights = 10**(self.mol_weights)
+        Parameters
+        ----------
+        calibration : Calibration
+            The calibration curve
+        """
+        self.calibration = calibration
+        self.calibration_axis = calibration.axis(
+            self.retention_times, self._grid
+        )
         
 
     def _define_line(self, lbound, rbound, trace):
@@ -151,27 +298,90 @@ class SEC:
             The left bound for the line
         rbound : int
             The right bound for the line
-        trace : int
-            The index of the trace for which to return a line
+        trace : int or slice or list
+            The index of the trace for which to return a line, or the
+            indices of several traces
 
         Returns
         -------
-        line : 1darray
+        line : 1darray or 2darray
             The y values of a line spanning the left bound and the
-            right bound on the specified trace
+            right bound on the specified trace, with one column per
+            trace if several traces were specified
         """
         slope = ((self.edited_traces[rbound, trace]-
                   self.edited_traces[lbound, trace])
                  /(self.retention_times[rbound]-
                    self.retention_times[lbound]))
 
-        line = (slope*(self.retention_times[lbound:rbound]
-                       -self.retention_times[lbound])
+        line = (np.multiply.outer(self.retention_times[lbound:rbound]
+                                  -self.retention_times[lbound], slope)
                 +self.edited_traces[lbound, trace])
         
         return line
     
 
+    def peak_statistics(self, lbound, rbound, cut, traces=None):
+        """
+        A method that calculates the number average, weight average
+        and z average molecular weights, dispersity and area of a
+        peak within the specified bounds for several traces at once
+
+        Parameters
+        ----------
+        lbound : float
+            The lower molecular weight bound of the peak
+        rbound : float
+            The upper molecular weight bound of the peak
+        cut : bool
+            Whether to but the peak at the two endpoints
+        traces : int or list
+            The index of the trace, or a list of the indices of the
+            traces, for which to calculate the statistics; defaults to
+            every trace
+
+        Returns
+        -------
+        statistics : dict
+            A dictionary with the keys 'mn', 'mw', 'mz', 'disp' and
+            'area' containing an array with the value for each trace,
+            or a single value if a single trace was specified
+        """
+        traces = slice(None) if traces is None else traces
+        lindex = self.get_weight_position(rbound)
+        rindex = self.get_weight_position(lbound)
+        mw_range = self.mol_weights[lindex:rindex]
+        
+        peaks = self.edited_traces[lindex:rindex, traces]
+        
+        if cut:
+            peaks = peaks - self._define_line(lindex, rindex, traces)
+
+        # Every integral is a weighted sum over the points of the
+        # peak, so the moments of the distribution and the area of
+        # every trace are found with a single matrix product
+        mw_weights = trapezoid_weights(mw_range)
+        weights = np.stack((
+            mw_weights/mw_range,
+            mw_weights,
+            mw_weights*mw_range,
+            mw_weights*mw_range**2,
+            trapezoid_weights(self.retention_times[lindex:rindex])
+        ))
+        moment0, moment1, moment2, moment3, area = weights @ peaks
+
+        n_avg = moment1/moment0
+        w_avg = moment2/moment1
+        
+        return {
+            'mn': n_avg,
+            'mw': w_avg,
+            'mz': moment3/moment2,
+            'disp': w_avg/n_avg,
+            'area': area
+        }
+        
+
     def area_calculator(self, lbound, rbound, cut, trace):
         """
         A method that calculates the area of a peak in a gpc
@@ -193,15 +403,7 @@ class SEC:
         area : float
             The surface area of the peak
         """
-        lindex = self.get_weight_position(rbound)
-        rindex = self.get_weight_position(lbound)
-        
-        peak = self.edited_traces[lindex:rindex, trace].copy()
-
-        if cut:
-            peak -= self._define_line(lindex, rindex, trace)
-
-        return np.trapezoid(peak, self.retention_times[lindex:rindex])
+        return self.peak_statistics(lbound, rbound, cut, trace)['area']
         
 
     def peak_calculator(self, lbound, rbound, cut, trace):
@@ -229,25 +431,11 @@ class SEC:
         dist : float
             The dispersity
         """
-        lindex = self.get_weight_position(rbound)
-        rindex = self.get_weight_position(lbound)
-        mw_range = self.mol_weights[lindex:rindex]
-        
-        peak = self.edited_traces[lindex:rindex, trace].copy()
-        
-        if cut:
-            peak -= self._define_line(lindex, rindex, trace)
-            
-        w_avg = (np.trapezoid(peak*mw_range, mw_range)/
-                 np.trapezoid(peak, mw_range))
-        n_avg = (np.trapezoid(peak, mw_range)/
-                 np.trapezoid(peak/mw_range, mw_range))
-        disp = w_avg/n_avg
-        
-        return [n_avg, w_avg, disp]
+        statistics = self.peak_statistics(lbound, rbound, cut, trace)
+        return [statistics['mn'], statistics['mw'], statistics['disp']]
     
 
-    def adjust_baseline(self, option):
+    def adjust_baseline(self, option, workers=None):
         """
         A method that changes the baseline of the distribution
 
@@ -262,34 +450,36 @@ class SEC:
                         negative peaks
                 stdev : Implements the standard deviation distribution
                         algorithm for baseline correction
+        workers : int
+            The maximum number of processes used to fit the baselines,
+            defaults to the number of processors
         """
-        # Creating the baseline fitting object that will be used
-        # for all of the baseline fitting options
-        baseline_fitter = Baseline(
-            self.retention_times, check_finite=False
-        )
-
         if option=='none':
             return None
 
-        methods = {
-            'loess' : lambda data : baseline_fitter.loess(
-                data, symmetric_weights=True, fraction=0.35,
-                scale=1.5, poly_order=2),
-            'stdev' : lambda data : baseline_fitter.std_distribution(
-                data)
-        }
-
-        if option not in methods:
-            raise ValueError(f"Unknown baseline option: {option}")
-
-        for i in range(self._num_traces):
-            baseline, params = methods[option](self.edited_traces[:, i])
-            self.edited_traces[:, i] -= baseline
+        # The baselines of a block of traces are fitted together since
+        # they share the same retention times, and baselines that have
+        # already been fitted for the same data are reused. The
+        # baselines are written to a new layer, so that edits saved by
+        # save_edits are left unchanged
+        edited_traces = self.edited_traces
+        baselines = self._zeros_store(len(self))
+        for block in self.trace_blocks():
+            # A baseline fitted to scaled traces is added to the layer
+            # in the units of the raw traces
+            baselines.array[:, block] = fit_baselines(
+                self.retention_times, edited_traces[:, block], option,
+                workers=workers, cache=self.baseline_cache
+            ) / self._scales[block]
+            if self._baseline_store is not None:
+                baselines.array[:, block] += self._baseline_store.array[
+                    :, block
+                ]
+        self._baseline_store = baselines
             
             
     def peak_normalize(self, style, lbound=None, rbound=None,
-                       ind_var='rt'):
+                       ind_var='rt', position=None):
         """
         A method that normalizes the peak of the GPC traces to one
         for each of the chromatograms in self.gpc_traces
@@ -302,43 +492,128 @@ class SEC:
                 individual : each peak is normalized individually
                 global : the peaks are normalized against the largest
                          global value
-            If the value is a float or int, then all traces are given
-            the same value at that molecular weight or retention time
-            and then globally nromalized
-        lbound : float
+                area : the area of each trace within the bounds is
+                       normalized to one
+                point : all traces are given the same value at the
+                        position and then globally normalized
+                integral : all traces are given the same area over
+                           the range of the position and then globally
+                           normalized
+            If the value is a float or int, then it is the position of
+            the point normalization
+        lbound : int
             The left bound for the region where the peak normalization
             is done
-        rbound : float
+        rbound : int
             The right bound for the region where the peak
             normalization is done
         ind_var : str
-            Whether the desired axis is retention time or molecular
+            Whether the position is a retention time or a molecular
             weight
                 rt : retention time
                 mw : molecular weight
+        position : float or tuple
+            The retention time or molecular weight of the point
+            normalization, or the lower and upper ends of the range of
+            the integral normalization
         """
         lbound = lbound if lbound is not None else 0
         rbound = rbound if rbound is not None else -1
-        
+        if not isinstance(style, str):
+            style, position = 'point', style
+        if style not in NORMALIZATION_STYLES:
+            raise ValueError(f'Unknown normalization: {style}')
+        if style in ('point', 'integral') and position is None:
+            raise ValueError(f'The {style} normalization requires a '
+                             'position')
+
+        # Normalizing only changes the scale factor of each trace, and
+        # the values each style divides the traces by are found with
+        # one broadcast operation per block of traces
+        rows = slice(lbound, rbound)
         if style == 'individual':
-            maxima = np.max(self.edited_traces[lbound:rbound], axis=0)
-            self.edited_traces /= maxima
-                
+            divisors = self._reduce_traces(rows, trace_heights)
         elif style == 'global':
-            self.edited_traces /= np.max(self.edited_traces[lbound:rbound])
-
+            divisors = np.max(self._reduce_traces(rows, trace_heights))
+        elif style == 'area':
+            weights = trapezoid_weights(self.retention_times[rows])
+            divisors = self._reduce_traces(
+                rows, partial(trace_integrals, weights=weights)
+            )
+        elif style == 'point':
+            index, fraction = self._fractional_position(position, ind_var)
+            divisors = self._reduce_traces(
+                slice(index, index + 2),
+                partial(trace_values, fraction=fraction)
+            )
         else:
-            if ind_var == 'rt':
-                point = self.get_time_position(style)
-            elif ind_var == 'mw':
-                point = self.get_time_position(style)
-            for trace in range(self.__len__()):
-                height = self.edited_traces[point, trace]
-                self.edited_traces[:, trace] /= height
-            self.edited_traces /= np.max(self.edited_traces[lbound:rbound])
-            
+            # Molecular weights decrease along the axis, so the range
+            # is put in the order of the points
+            ends = sorted(self._position(end, ind_var) for end in position)
+            if ends[1] - ends[0] < 2:
+                raise ValueError('The integral normalization range must '
+                                 'contain at least two points')
+            span = slice(*ends)
+            weights = trapezoid_weights(self.retention_times[span])
+            divisors = self._reduce_traces(
+                span, partial(trace_integrals, weights=weights)
+            )
+        self._scales = self._scales / divisors
+
+        if style in ('point', 'integral'):
+            self._scales = self._scales / np.max(
+                self._reduce_traces(rows, trace_heights)
+            )
+
+
+    def _reduce_traces(self, rows, function):
+        # Applies a function to the points of each block of raw traces
+        # less their baselines along with the scale factor of each
+        # trace, so the traces are only copied to subtract a baseline
+        results = []
+        for block in self.trace_blocks():
+            traces = self.gpc_traces[rows, block]
+            if self._baseline_store is not None:
+                traces = np.subtract(
+                    traces, self._baseline_store.array[rows, block],
+                    dtype=self.dtype
+                )
+            results.append(function(traces, self._scales[block]))
+        return np.concatenate(results)
+
+
+    def _position(self, value, ind_var):
+        # The index of a retention time or molecular weight
+        if ind_var == 'rt':
+            return self.get_time_position(value)
+        if ind_var == 'mw':
+            if self.calibration_axis is None:
+                raise ValueError('A calibration is required to use '
+                                 'molecular weights')
+            return self.get_weight_position(value)
+        raise ValueError(f'Unknown independent variable: {ind_var}')
+
+
+    def _fractional_position(self, value, ind_var):
+        # The index of the point before a retention time or molecular
+        # weight and the fraction of the way to the next point
+        points = len(self.retention_times)
+        if ind_var == 'rt':
+            position = np.interp(value, self.retention_times,
+                                 np.arange(points))
+        elif ind_var == 'mw':
+            if self.calibration_axis is None:
+                raise ValueError('A calibration is required to use '
+                                 'molecular weights')
+            position = self.calibration_axis.fractional_position(value)
+        else:
+            raise ValueError(f'Unknown independent variable: {ind_var}')
+        index = min(int(position), max(points - 2, 0))
+        return index, float(position - index)
+
 
-    def deconvolute(self, peaks, trace, lbound, rbound):
+    def deconvolute(self, peaks, trace, lbound, rbound, starts=1,
+                    workers=None, max_time=None, max_nfev=None):
         """
         A method that deconvolutes a trace into multiple gaussian
         peaks
@@ -356,6 +631,20 @@ class SEC:
         rbound : foat
             The right bound for the region where the peak
             normalization is done (must represent a molecular weight)
+        starts : int
+            The number of initial guesses the fit is started from, the
+            best fit is kept; guesses after the first are derived from
+            the local maxima of the trace
+        workers : int
+            The maximum number of processes fitting the starts in
+            parallel, defaults to the number of processors
+        max_time : float
+            The time in seconds after which no further starts are
+            begun and the running starts stop, keeping the best
+            parameters they reached
+        max_nfev : int
+            The maximum number of evaluations of the residuals for
+            each start
 
         Returns
         -------
@@ -370,76 +659,143 @@ class SEC:
         areas : list
             A list containing the areas of each of the peaks
             (normalized to 100)
-        new_peaks : 2darray
-            An array containing the fitted peaks
-        """
-
-        def gaussian(mws, mn, d):
-            sigma = np.sqrt(np.log(d))
-            power = -((np.log(mws)-np.log(mn/d))**2)/(2*sigma**2)
-            return np.exp(power)/sigma/np.sqrt(2*np.pi)
-
-        def resids(params, mws, meas_trace, peaks, penalty):
-            new_trace = np.zeros_like(meas_trace)
-            for i in range(peaks):
-                new_trace += params[3*i+2]*gaussian(mws, params[3*i],
-                                                    params[3*i+1])
-            calc_resids = new_trace - meas_trace
-            calc_resids[calc_resids>0] *= penalty
-            return calc_resids
-        
+        peaks : SparsePeaks
+            The fitted peaks, evaluated only where they are not
+            negligible
+        """
         irbound = self.get_weight_position(lbound)
         ilbound = self.get_weight_position(rbound)
 
-        init_guess = []
-        bounds = ([], [])
-        for i in range(peaks):
-            # Initial guess for mn for all peaks is the average of the
-            # bounds
-            init_guess.append(np.exp((np.log(lbound)+np.log(rbound))/2))
-            bounds[0].append(lbound)
-            bounds[1].append(rbound)
-            # Initial guess for the dispersity
-            init_guess.append(1.1)
-            bounds[0].append(1.0)
-            bounds[1].append(3.0)
-            # Initial guess for the weight
-            init_guess.append(1.0)
-            bounds[0].append(0)
-            bounds[1].append(np.inf)
-
-        penalty = 10
-        res = least_squares(resids, init_guess, bounds=bounds,
-                            args=(self.mol_weights[ilbound:irbound],
-                                  self.edited_traces[ilbound:irbound, trace],
-                                  peaks, penalty))
-
-        mns = res['x'][::3]
-        disp = res['x'][1::3]
-        mws = mns*disp
-        areas = 100 * res['x'][2::3] / np.sum(res['x'][2::3])
-        
-        new_peaks = np.zeros((len(self.mol_weights), peaks))
-        for i in range(peaks):
-            new_peaks[:, i] = res['x'][3*i+2]*gaussian(self.mol_weights,
-                                                       mns[i], disp[i])
+        params = fit_peaks(
+            self.mol_weights[ilbound:irbound],
+            self.edited_traces[ilbound:irbound, trace],
+            peaks, lbound, rbound, starts=starts, workers=workers,
+            max_time=max_time, max_nfev=max_nfev
+        )
 
-        return {
-            'mns' : mns,
-            'mws': mws,
-            'disp': disp,
-            'areas': areas,
-            'x' : self.mol_weights,
-            'peaks' : new_peaks
-        }
+        results = peak_summary(params)
+        results['peaks'] = SparsePeaks(params, self.mol_weights)
+        return results
+
+
+    def deconvolute_traces(self, peaks, lbound, rbound, traces=None,
+                           starts=1, workers=None, max_time=None,
+                           max_nfev=None):
+        """
+        A method that deconvolutes several traces into the same number
+        of gaussian peaks within the same bounds, fitting the traces
+        in parallel processes and starting each fit from the solution
+        of the previous trace
+
+        Parameters
+        ----------
+        peaks : int
+            The number of peaks to deconvolute each trace into
+        lbound : float
+            The lower molecular weight bound of the fit
+        rbound : float
+            The upper molecular weight bound of the fit
+        traces : list
+            The indices of the traces to deconvolute, defaults to
+            every trace
+        starts : int
+            The number of initial guesses each fit is started from
+        workers : int
+            The maximum number of processes fitting the traces in
+            parallel, defaults to the number of processors
+        max_time : float
+            The time in seconds that the starts of each fit may take,
+            after which the fit returns the best parameters reached
+        max_nfev : int
+            The maximum number of evaluations of the residuals for
+            each start
+
+        Returns
+        -------
+        traces : list
+            The indices of the deconvoluted traces
+        mns : 2darray
+            The number average molecular weights of the peaks, with
+            one row per trace
+        mws : 2darray
+            The weight average molecular weights of the peaks
+        disp : 2darray
+            The dispersities of the peaks
+        areas : 2darray
+            The areas of the peaks, normalized to 100 for each trace
+        params : 2darray
+            The Mn, dispersity and weight of each peak in turn, with
+            one row per trace, from which the fitted peaks can be
+            calculated
+        """
+        traces = list(range(len(self))) if traces is None else list(traces)
+        irbound = self.get_weight_position(lbound)
+        ilbound = self.get_weight_position(rbound)
+
+        params = fit_traces(
+            self.mol_weights[ilbound:irbound],
+            self.edited_traces[ilbound:irbound, traces],
+            peaks, lbound, rbound, starts=starts, workers=workers,
+            max_time=max_time, max_nfev=max_nfev
+        )
+
+        results = peak_summary(params)
+        results.update({'traces': traces, 'params': params})
+        return results
 
 
     def reset_traces(self):
         """
         A method that resets the edited traces attribute in order to
-        refresh it for new manipulation
+        refresh it for new manipulation; only the layers of edits are
+        discarded, the traces themselves are not copied
+        """
+        self._baseline_store = None
+        self._scales = np.ones(len(self))
+
+
+    def save_edits(self):
+        """
+        A method that keeps the current edits of the traces, to which
+        they can later be returned by restore_edits. The layers of
+        edits are never modified in place, so no traces are copied
+        """
+        self._saved_edits = (self._baseline_store, self._scales)
+
+
+    def restore_edits(self):
+        """
+        A method that returns the edited traces to the edits kept by
+        the last call to save_edits
         """
-        self.edited_traces = self.gpc_traces.copy()
+        if self._saved_edits is None:
+            raise ValueError('The edited traces have not been saved')
+        baselines, scales = self._saved_edits
+        if len(scales) != len(self):
+            raise ValueError('Traces were added after the edits were saved')
+        self._baseline_store, self._scales = baselines, scales
+
+
+    def move_to_disk(self):
+        """
+        A method that moves the traces into memory-mapped files on
+        disk, after which only the parts of the traces being used are
+        kept in memory
+        """
+        if self.out_of_core:
+            return None
+
+        self.out_of_core = True
+        self._raw_store = self._new_store(self.gpc_traces)
+        moved = {None: None}
+        for store in (self._baseline_store, self._saved_edits and
+                      self._saved_edits[0]):
+            if store not in moved:
+                moved[store] = self._new_store(store.array)
+        self._baseline_store = moved[self._baseline_store]
+        if self._saved_edits is not None:
+            self._saved_edits = (moved[self._saved_edits[0]],
+                                 self._saved_edits[1])
 
         
     def append(self, new_sec):
@@ -453,15 +809,96 @@ class SEC:
             Another sec trace from which the traces are desired to be
             added
         """
-        # Add some sort of code to check to make sure that the
-        # retention times are identical; for now this is not needed
-        new_traces = np.concatenate((self.gpc_traces,
-                                     new_sec.gpc_traces),
-                                    axis=1)
-        self.gpc_traces = new_traces
-        self.colors = self.colors + new_sec.colors
-        self.names = self.names + new_sec.names
-        self._num_traces += new_sec._num_traces
+        self.extend([new_sec])
+
+
+    def extend(self, new_secs):
+        """
+        A method that adds the traces from several sec objects to the
+        current sec object, growing the trace storage at most once
+
+        Parameters
+        ----------
+        new_secs: list
+            A list of sec objects from which the traces are desired
+            to be added
+
+        Warns
+        -----
+        UserWarning
+            When traces measured on another grid of retention times
+            do not span the grid of the current object
+        """
+        if len(new_secs) == 0:
+            return None
+
+        # The raw traces and their baselines are moved to disk before
+        # growing once together they would no longer fit in the limit
+        new_count = len(self) + sum(len(sec) for sec in new_secs)
+        point_bytes = self._raw_store.array.itemsize + self.dtype.itemsize
+        if (self._automatic_storage and
+            point_bytes*new_count*len(self.retention_times) >
+            IN_MEMORY_BYTES):
+            self.move_to_disk()
+
+        # Traces measured on a different retention time grid, such as
+        # those from another instrument or sampling rate, are
+        # resampled onto the grid of the current object
+        raw_traces = []
+        baselines = []
+        uncovered = []
+        for sec in new_secs:
+            if sec._baseline_store is None:
+                sec_baselines = np.zeros((len(self.retention_times),
+                                          len(sec)), dtype=self.dtype)
+            else:
+                sec_baselines = sec._baseline_store.array
+            if sec._grid == self._grid:
+                raw_traces.append(sec.gpc_traces)
+                baselines.append(sec_baselines)
+            else:
+                if not grid_covers(sec.retention_times,
+                                   self.retention_times):
+                    uncovered.extend(sec.names)
+                raw_traces.append(resample_traces(
+                    sec.retention_times, sec.gpc_traces,
+                    self.retention_times
+                ))
+                if sec._baseline_store is not None:
+                    sec_baselines = resample_traces(
+                        sec.retention_times, sec_baselines,
+                        self.retention_times
+                    )
+                baselines.append(sec_baselines)
+
+        # The layers of edits of the other objects are added alongside
+        # their traces; the baselines are only stored once any trace
+        # has a baseline
+        self._raw_store.extend(raw_traces)
+        if (self._baseline_store is None and
+            any(sec._baseline_store is not None for sec in new_secs)):
+            self._baseline_store = self._zeros_store(len(self))
+        if self._baseline_store is not None:
+            self._baseline_store.extend([
+                np.asarray(b, dtype=self.dtype) for b in baselines
+            ])
+        self._scales = np.concatenate(
+            [self._scales] + [sec._scales for sec in new_secs]
+        )
+        for sec in new_secs:
+            self.colors.extend(sec.colors)
+            self.names.extend(sec.names)
+            self._num_traces += len(sec)
+
+        # Outside of the times they were measured at, resampled traces
+        # hold the value of their first or last point
+        if uncovered:
+            warnings.warn(
+                'The retention times of {} do not cover those of the '
+                'existing traces; outside of the measured times they '
+                'are extended with their first or last '
+                'value'.format(', '.join(uncovered))
+            )
 
     def __len__(self):
         """
@@ -0,0 +1,202 @@
+import tempfile
+import numpy as np
+
+
+class TraceStore:
+    def __init__(self, traces):
+        """
+        The TraceStore class holds a growing set of traces as the
+        columns of a single array whose capacity doubles whenever it
+        is exhausted, so appending traces one file at a time only
+        copies the existing data a logarithmic number of times
+
+        Parameters
+        ----------
+        traces : 2darray
+            A 2D numpy array with one trace per column used as the
+            initial contents of the store; it is not copied until
+            more traces are appended
+
+        Attributes
+        ----------
+        array : 2darray
+            A view of the stored traces with one trace per column
+        """
+        self._buffer = np.atleast_2d(traces)
+        self._count = self._buffer.shape[1]
+
+
+    @classmethod
+    def zeros(cls, shape, dtype=np.float64, **kwargs):
+        """
+        A method that creates a store holding traces of zeros
+
+        Parameters
+        ----------
+        shape : tuple
+            The number of points and the number of traces
+        dtype : dtype
+            The data type of the traces
+        **kwargs
+            The other arguments of the store
+
+        Returns
+        -------
+        store : TraceStore
+            A store with the specified number of traces of zeros
+        """
+        store = cls(np.zeros((shape[0], 0), dtype=dtype), **kwargs)
+        store._reserve(shape[1], np.dtype(dtype))
+        store._count = shape[1]
+        return store
+
+
+    @property
+    def array(self):
+        return self._buffer[:, :self._count]
+
+
+    @property
+    def capacity(self):
+        return self._buffer.shape[1]
+
+
+    def append(self, traces):
+        """
+        A method that adds traces to the end of the store
+
+        Parameters
+        ----------
+        traces : 2darray
+            A 2D numpy array with one trace per column
+        """
+        self.extend([traces])
+
+
+    def extend(self, traces_list):
+        """
+        A method that adds the traces of several arrays to the end of
+        the store, growing the storage at most once
+
+        Parameters
+        ----------
+        traces_list : list
+            A list of 2D numpy arrays with one trace per column
+        """
+        traces_list = [np.atleast_2d(traces) for traces in traces_list]
+        for traces in traces_list:
+            if traces.shape[0] != self._buffer.shape[0]:
+                raise ValueError(
+                    f'Traces with {traces.shape[0]} points cannot be '
+                    f'stored with traces of {self._buffer.shape[0]} points'
+                )
+
+        new_count = self._count + sum(t.shape[1] for t in traces_list)
+        dtype = np.result_type(self._buffer, *traces_list)
+        self._reserve(new_count, dtype)
+
+        for traces in traces_list:
+            width = traces.shape[1]
+            self._buffer[:, self._count:self._count+width] = traces
+            self._count += width
+
+
+    def assign(self, traces):
+        """
+        A method that overwrites the stored traces with new values,
+        reusing the existing storage when the shapes match
+
+        Parameters
+        ----------
+        traces : 2darray
+            A 2D numpy array with one trace per column
+        """
+        traces = np.atleast_2d(traces)
+        if traces.shape == self.array.shape and self._buffer.flags.writeable:
+            # In-place arithmetic on the array view hands the same
+            # view back, in which case there is nothing to copy
+            if traces.base is not self._buffer:
+                self._buffer[:, :self._count] = traces
+            return None
+
+        self._buffer = self._allocate(traces.shape, traces.dtype)
+        self._buffer[...] = traces
+        self._count = self._buffer.shape[1]
+
+
+    def _reserve(self, count, dtype):
+        # The storage is reallocated with double the capacity so that
+        # the cost of copying is amortized over many appends
+        if (count <= self.capacity and dtype == self._buffer.dtype and
+            self._buffer.flags.writeable):
+            return None
+
+        capacity = max(count, 2*self.capacity)
+        buffer = self._allocate((self._buffer.shape[0], capacity), dtype)
+        buffer[:, :self._count] = self.array
+        self._buffer = buffer
+
+
+    def _allocate(self, shape, dtype):
+        # The traces are kept in column-major order so that each trace
+        # is contiguous in memory; new storage is filled with zeros,
+        # which the operating system provides without writing them
+        return np.zeros(shape, dtype=dtype, order='F')
+
+
+    def __len__(self):
+        """
+        A method that returns how many traces are in the store
+
+        Returns
+        -------
+        length : int
+            The number of traces within the store
+        """
+        return self._count
+
+
+class MappedTraceStore(TraceStore):
+    def __init__(self, traces, directory=None):
+        """
+        The MappedTraceStore class holds a growing set of traces in a
+        memory-mapped temporary file rather than in memory, so the
+        operating system only keeps the parts of the traces that are
+        being used in memory. The file is deleted once the store is no
+        longer used
+
+        Parameters
+        ----------
+        traces : 2darray
+            A 2D numpy array with one trace per column, copied into
+            the file as the initial contents of the store
+        directory : string
+            The directory in which the file is created, defaults to
+            the temporary directory of the system
+
+        Attributes
+        ----------
+        array : 2darray
+            A memory-mapped view of the stored traces with one trace
+            per column
+        directory : string
+            The directory in which the file is created
+        """
+        self.directory = directory
+        traces = np.atleast_2d(traces)
+        self._buffer = self._allocate(traces.shape, traces.dtype)
+        self._buffer[...] = traces
+        self._count = traces.shape[1]
+
+
+    def _allocate(self, shape, dtype):
+        # An unnamed temporary file is removed by the operating system
+        # once both the file and the mapping are closed, so discarded
+        # buffers do not leave files behind; the mapping keeps its own
+        # handle to the file, which reads as zeros until written
+        dtype = np.dtype(dtype)
+        if shape[0]*shape[1] == 0:
+            return np.zeros(shape, dtype=dtype, order='F')
+        with tempfile.TemporaryFile(dir=self.directory) as file:
+            return np.memmap(file, dtype=dtype, mode='w+', shape=shape,
+                             order='F')
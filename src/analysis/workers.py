@@ -0,0 +1,32 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# The pool of worker processes shared by the parts of the analysis that
+# run in parallel, created when it is first needed
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def process_pool():
+    """
+    Returns the pool of worker processes shared by the analyses that
+    run in parallel. The workers are started with spawn rather than
+    fork, since the pool is used from threads of a process that runs
+    other threads, such as the Qt chart worker, and a forked child
+    only inherits the calling thread. The workers are only started as
+    tasks are submitted and are kept for later tasks, so their startup
+    is paid once
+
+    Returns
+    -------
+    executor : ProcessPoolExecutor
+        The shared pool of worker processes
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
@@ -0,0 +1,324 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis.sec import SEC
+from analysis.cache import TraceCache
+from analysis.calibration import (CALIBRATION_PARAMS, MAX_ORDER,
+                                  PolynomialCalibration,
+                                  UniversalCalibration, make_calibration)
+from analysis.normalization import parse_normalization
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='secan-batch',
+        description='Processes SEC data files without the graphical '
+                    'interface and writes the results to a CSV or '
+                    'JSON file'
+    )
+    parser.add_argument(
+        'inputs', nargs='+',
+        help='data files or glob patterns, such as "runs/*.txt"'
+    )
+    parser.add_argument(
+        '-o', '--output', required=True,
+        help='the results file; the format is chosen from the '
+             'extension, .json for JSON and CSV otherwise'
+    )
+    parser.add_argument(
+        '--baseline', choices=('none', 'loess', 'stdev'), default='none',
+        help='the baseline correction method'
+    )
+    parser.add_argument(
+        '--normalization', default='individual',
+        help='individual, global, area, a retention time at which every '
+             'trace is given the same value, or two retention times '
+             '"LOWER,UPPER" between which every trace is given the same '
+             'area'
+    )
+    parser.add_argument(
+        '--calibration', nargs='+', metavar='VALUE',
+        help='the calibration method followed by its parameters, such '
+             'as "linear -0.5 11" for log10(MW) = -0.5t + 11'
+    )
+    parser.add_argument(
+        '--standards', metavar='FILE',
+        help='a CSV file with the retention time and peak molecular '
+             'weight of a standard on each row, to which the calibration '
+             'curve is fitted instead of using --calibration'
+    )
+    parser.add_argument(
+        '--order', type=int, default=3, choices=range(1, MAX_ORDER + 1),
+        help='the order of the polynomial fitted to the standards'
+    )
+    parser.add_argument(
+        '--mark-houwink', nargs=4, type=float,
+        metavar=('K_STANDARD', 'A_STANDARD', 'K_SAMPLE', 'A_SAMPLE'),
+        help='Mark-Houwink constants of the standards and the sample, '
+             'for universal calibration from the standards'
+    )
+    parser.add_argument(
+        '--peak', nargs=2, type=float, metavar=('LOWER', 'UPPER'),
+        help='molecular weight bounds of a peak for which Mn, Mw, Mz, '
+             'dispersity and area are calculated'
+    )
+    parser.add_argument(
+        '--cut', action='store_true',
+        help='cut the peak at its bounds rather than dropping to zero'
+    )
+    parser.add_argument(
+        '--deconvolute', nargs=3, type=float,
+        metavar=('PEAKS', 'LOWER', 'UPPER'),
+        help='deconvolute each trace into PEAKS peaks between the '
+             'molecular weight bounds'
+    )
+    parser.add_argument(
+        '--starts', type=int, default=1,
+        help='the number of initial guesses each deconvolution is '
+             'started from, the best fit is kept'
+    )
+    parser.add_argument(
+        '--max-time', type=float,
+        help='the time in seconds that the starts of each deconvolution '
+             'may take; once it passes no further starts are begun and '
+             'the running starts stop, keeping the best fit reached'
+    )
+    parser.add_argument(
+        '--max-nfev', type=int,
+        help='the maximum number of residual evaluations of each '
+             'deconvolution start'
+    )
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=os.cpu_count(),
+        help='the number of files processed in parallel'
+    )
+    parser.add_argument(
+        '--cache', action='store_true',
+        help='use the import cache shared with the graphical interface'
+    )
+    args = parser.parse_args(argv)
+
+    if args.calibration is not None and args.standards is not None:
+        parser.error('--calibration and --standards cannot both be used')
+    if args.mark_houwink is not None and args.standards is None:
+        parser.error('--mark-houwink requires --standards')
+
+    if args.calibration is not None:
+        method, values = args.calibration[0].lower(), args.calibration[1:]
+        if method not in CALIBRATION_PARAMS:
+            parser.error(f'unknown calibration method: {method}')
+        if len(values) != len(CALIBRATION_PARAMS[method]):
+            parser.error(f'{method} calibration requires '
+                         f'{len(CALIBRATION_PARAMS[method])} parameters')
+        try:
+            args.calibration = make_calibration(
+                dict(zip(CALIBRATION_PARAMS[method], map(float, values))),
+                method
+            )
+        except ValueError:
+            parser.error('calibration parameters must be numbers')
+    elif args.standards is not None:
+        try:
+            args.calibration = read_standards(args.standards, args.order)
+            if args.mark_houwink is not None:
+                args.calibration = UniversalCalibration(
+                    args.calibration, args.mark_houwink[:2],
+                    args.mark_houwink[2:]
+                )
+        except (OSError, ValueError) as e:
+            parser.error(f'could not fit the standards: {e}')
+    elif args.peak is not None or args.deconvolute is not None:
+        parser.error('--peak and --deconvolute require --calibration or '
+                     '--standards')
+
+    # A single number is the position of the point normalization and
+    # two numbers the range of the integral normalization
+    style = args.normalization
+    if style not in ('individual', 'global', 'area'):
+        style = 'integral' if ',' in style else 'point'
+    try:
+        args.normalization = (
+            style, parse_normalization(style, args.normalization)
+        )
+    except ValueError:
+        parser.error(f'unknown normalization: {args.normalization}')
+
+    return args
+
+
+def read_standards(filename, order):
+    """
+    Fits a calibration curve to the standards listed in a CSV file,
+    skipping any rows that do not hold two numbers such as a header
+
+    Parameters
+    ----------
+    filename : string
+        The CSV file with the retention time and peak molecular weight
+        of a standard on each row
+    order : int
+        The order of the polynomial fitted to the standards
+
+    Returns
+    -------
+    calibration : PolynomialCalibration
+        The fitted calibration curve
+    """
+    times, weights = [], []
+    with open(filename, newline='') as standards_file:
+        for row in csv.reader(standards_file):
+            try:
+                time, weight = float(row[0]), float(row[1])
+            except (IndexError, ValueError):
+                continue
+            times.append(time)
+            weights.append(weight)
+    return PolynomialCalibration.fit(times, weights, order)
+
+
+def find_files(patterns):
+    """
+    Expands a list of filenames and glob patterns into a sorted list
+    of data files without duplicates
+
+    Parameters
+    ----------
+    patterns : list
+        A list of filenames or glob patterns
+
+    Returns
+    -------
+    filenames : list
+        The matching files
+    """
+    filenames = set()
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True)
+        filenames.update(match for match in matches if os.path.isfile(match))
+    return sorted(filenames)
+
+
+def process_file(filename, options):
+    """
+    Runs the SEC processing pipeline on a single data file
+
+    Parameters
+    ----------
+    filename : string
+        The data file to process
+    options : Namespace
+        The parsed command line options
+
+    Returns
+    -------
+    rows : list
+        A dictionary of results for each trace within the file
+    """
+    cache = TraceCache() if options.cache else None
+    sec = SEC(filename, cache)
+    if options.calibration is not None:
+        sec.set_calibration(options.calibration)
+
+    # Files are already processed in parallel so the baselines of
+    # each file are fitted in the worker process itself
+    sec.adjust_baseline(options.baseline, workers=1)
+    style, position = options.normalization
+    sec.peak_normalize(style, position=position)
+
+    if options.peak is not None:
+        lbound, rbound = options.peak
+        statistics = sec.peak_statistics(lbound, rbound, options.cut)
+
+    # The traces of a file are deconvoluted in turn, each starting
+    # from the fit of the previous trace
+    if options.deconvolute is not None:
+        peaks, lbound, rbound = options.deconvolute
+        deconvolution = sec.deconvolute_traces(
+            int(peaks), lbound, rbound, starts=options.starts, workers=1,
+            max_time=options.max_time, max_nfev=options.max_nfev
+        )
+
+    rows = []
+    for trace in range(len(sec)):
+        row = {'file': filename, 'trace': trace + 1,
+               'name': sec.names[trace]}
+
+        if options.peak is not None:
+            row.update({key: statistics[key][trace]
+                        for key in ('mn', 'mw', 'mz', 'disp', 'area')})
+
+        if options.deconvolute is not None:
+            for i in range(int(peaks)):
+                for key in ('mns', 'mws', 'disp', 'areas'):
+                    row[f'peak{i+1}_{key}'] = deconvolution[key][trace, i]
+
+        rows.append(row)
+    return rows
+
+
+def write_results(filename, rows):
+    """
+    Writes the results to a JSON file if the filename ends in .json
+    and to a CSV file otherwise
+
+    Parameters
+    ----------
+    filename : string
+        The results file
+    rows : list
+        A dictionary of results for each trace
+    """
+    rows = [{key: _to_builtin(value) for key, value in row.items()}
+            for row in rows]
+
+    if filename.lower().endswith('.json'):
+        with open(filename, 'w') as results_file:
+            json.dump(rows, results_file, indent=2)
+        return None
+
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    with open(filename, 'w', newline='') as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _to_builtin(value):
+    # numpy scalars are converted so that they can be written as JSON
+    return value.item() if hasattr(value, 'item') else value
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    filenames = find_files(options.inputs)
+    if not filenames:
+        print('No data files matched the inputs', file=sys.stderr)
+        return 1
+
+    rows = []
+    failures = 0
+    with ProcessPoolExecutor(max_workers=max(options.jobs, 1)) as executor:
+        futures = [executor.submit(process_file, filename, options)
+                   for filename in filenames]
+        for filename, future in zip(filenames, futures):
+            try:
+                rows.extend(future.result())
+            except Exception as e:
+                failures += 1
+                rows.append({'file': filename, 'error': str(e)})
+                print(f'Failed to process {filename}: {e}', file=sys.stderr)
+
+    write_results(options.output, rows)
+    print(f'Processed {len(filenames) - failures} of {len(filenames)} files')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,15 @@
 import sys
+import multiprocessing
 from PySide6 import QtWidgets
 from view.main_window import Secan
 from dialogs.error_log_dialog import UncaughtHook
 
 
 def main():
+    # Baseline fitting uses worker processes, which need to be
+    # bootstrapped when running as a frozen executable
+    multiprocessing.freeze_support()
+
     # Create QApplication instance
     app = QtWidgets.QApplication(sys.argv)
     
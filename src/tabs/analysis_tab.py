@@ -1,4 +1,5 @@
 from PySide6 import QtCore, QtWidgets, QtGui
+from tabs.trace_model import TraceListModel
 
 class AnalysisTab(QtWidgets.QWidget):
     def __init__(self, parent=None):
@@ -6,25 +7,26 @@ class AnalysisTab(QtWidgets.QWidget):
         super().__init__(parent)
         self.layout = QtWidgets.QVBoxLayout(self)
         self.params = dict()
-        self.selection = QtWidgets.QListWidget()
+        # The list view only shows the name column of the model
+        self.trace_model = TraceListModel(self)
+        self.selection = QtWidgets.QListView()
+        self.selection.setModel(self.trace_model)
+        self.selection.setSelectionMode(
+            QtWidgets.QAbstractItemView.SingleSelection
+        )
+        self.selection.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers
+        )
+        self.selection.setUniformItemSizes(True)
         self.show_check = QtWidgets.QCheckBox('Show')
         
 
     def update_selection_list(self, select_list, sec_object):
-        select_list.clear()
-        select_list.setSelectionMode(
-            QtWidgets.QListWidget.SingleSelection
-        )
-        
-        for i in range(len(sec_object)):
-            item_widget = QtWidgets.QLabel(sec_object.names[i])
-            list_item = QtWidgets.QListWidgetItem()
-            list_item.setSizeHint(item_widget.sizeHint())
-        
-            select_list.addItem(list_item)
-            select_list.setItemWidget(list_item, item_widget)
-            
-        select_list.setCurrentRow(0)
+        # Traces added to the same sec object are appended to the
+        # model, which keeps the selected trace
+        select_list.model().set_sec(sec_object)
+        if not select_list.currentIndex().isValid():
+            select_list.setCurrentIndex(select_list.model().index(0, 0))
         
 
     def update_selection(self, sec_object):
@@ -32,10 +34,30 @@ class AnalysisTab(QtWidgets.QWidget):
             self.update_selection_list(self.selection, sec_object)
 
     
-    def update_analysis(self, sec_object):
+    def analysis_state(self):
+        # The values the analysis depends on, used to detect whether
+        # the analysis must be recomputed
+        return (self.selection.currentIndex().row(),)
+
+    
+    def compute_analysis(self, sec_object, state):
+        # Performs the analysis described by the state returned by
+        # analysis_state without touching any widgets, so that it can
+        # run on a worker thread
+        return None
+
+    
+    def show_analysis(self, results):
+        # Displays the results returned by compute_analysis
         pass
 
     
+    def update_analysis(self, sec_object):
+        self.show_analysis(
+            self.compute_analysis(sec_object, self.analysis_state())
+        )
+
+    
     def add_graph(self, ax_object, sec_object):
         pass
     
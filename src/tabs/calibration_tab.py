@@ -1,6 +1,65 @@
 from PySide6 import QtCore, QtWidgets, QtGui
 
+from analysis.calibration import (MAX_ORDER, PolynomialCalibration,
+                                  UniversalCalibration, make_calibration)
+
+# The Mark-Houwink constants entered for universal calibration
+MARK_HOUWINK_FIELDS = ('K (standards)', 'a (standards)', 'K (sample)',
+                       'a (sample)')
+
+# The possible calibration curve options along with the parameters
+# they require
+CALIBRATION_OPTIONS = {'Linear' : ['a', 'b'],
+                       'Cubic' : ['a', 'b', 'c', 'd'],
+                       'Standards' : []}
+
+
+def parse_calibration(state):
+    """
+    Converts the state returned by CalibrationTab.calibration_state
+    into a calibration curve; no widgets are touched, so that the
+    curve can be fitted off the GUI thread
+
+    Parameters
+    ----------
+    state : tuple
+        The type of calibration followed by the raw contents of its
+        fields
+
+    Returns
+    -------
+    calibration : Calibration
+        The calibration curve, or None if no fields are filled in
+    """
+    calib_type, values = state[0], state[1:]
+    if calib_type != 'Standards':
+        if not any(value.strip() for value in values):
+            return None
+        params = dict()
+        for constant, value in zip(CALIBRATION_OPTIONS[calib_type], values):
+            params[constant] = float(value)
+        return make_calibration(params, calib_type.lower())
+
+    # Empty rows of the standards table are skipped
+    order, rows, universal, constants = values
+    rows = [row for row in rows if any(value.strip() for value in row)]
+    if not rows:
+        return None
+    times = [float(time) for time, _ in rows]
+    weights = [float(weight) for _, weight in rows]
+    calibration = PolynomialCalibration.fit(times, weights, order)
+    if universal:
+        constants = [float(value) for value in constants]
+        calibration = UniversalCalibration(
+            calibration, constants[:2], constants[2:]
+        )
+    return calibration
+
+
 class CalibrationTab(QtWidgets.QWidget):
+    # Emitted whenever a field that defines the calibration is edited
+    calibration_changed = QtCore.Signal()
+
     def __init__(self, parent=None):
         # Initial dialog box setup functions
         super().__init__(parent)
@@ -8,6 +67,7 @@ class CalibrationTab(QtWidgets.QWidget):
         layout = QtWidgets.QVBoxLayout(self)
         self.calib_parameters = dict()
         self.calib_type = None
+        self.calibration = None
         self.line_edits = dict()
         
         # A form containing the various calibration curve inputs
@@ -15,14 +75,18 @@ class CalibrationTab(QtWidgets.QWidget):
 
         # The possible calibration curve options along with the
         # parameters they require
-        self.calib_options = {'Linear' : ['a', 'b'],
-                              'Cubic' : ['a', 'b', 'c', 'd']}
+        self.calib_options = CALIBRATION_OPTIONS
 
         self.calib_eqns = {
             'Linear' : 'log<sub>10</sub>(MW) = at+b',
-            'Cubic' : 'log<sub>10</sub>(MW) = at<sup>3</sup>+bt<sup>2</sup>+ct+d'
+            'Cubic' : 'log<sub>10</sub>(MW) = at<sup>3</sup>+bt<sup>2</sup>+ct+d',
+            'Standards' : 'log<sub>10</sub>(M<sub>p</sub>) fitted to the standards'
         }
 
+        # The widgets used to fit the calibration curve to a table of
+        # standards, shown only for the standards fitting type
+        self.standards_widget = self._create_standards_widget()
+
         # Equation to display to make the parameters more sensical
         self.calib_eqn_label = QtWidgets.QLabel()
 
@@ -33,10 +97,17 @@ class CalibrationTab(QtWidgets.QWidget):
             self.calib_options.keys()
         )
         self.select_calib_method_combo.currentTextChanged.connect(self.combo_changed)
+        self.select_calib_method_combo.currentTextChanged.connect(
+            self.calibration_changed
+        )
 
         # The date upon which the calibration was updated
         self.date_box = QtWidgets.QLabel()
 
+        # A description of the calibration curve in use
+        self.fit_label = QtWidgets.QLabel()
+        self.fit_label.setWordWrap(True)
+
         # Updating the form to have the initial value
         self.combo_changed(self.select_calib_method_combo.currentText())
 
@@ -49,6 +120,8 @@ class CalibrationTab(QtWidgets.QWidget):
         layout.addWidget(self.calib_eqn_label)
         self.calib_eqn_label.setContentsMargins(0, 10, 0, 30)
         layout.addLayout(self.calib_input_form)
+        layout.addWidget(self.standards_widget)
+        layout.addWidget(self.fit_label)
         layout.addWidget(self.date_box)
         layout.addStretch()
 
@@ -63,6 +136,7 @@ class CalibrationTab(QtWidgets.QWidget):
         # Changing which calibration equation is displayed
         self.calib_eqn_label.setText(self.calib_eqns[text])
         self.calib_eqn_label.setAlignment(QtCore.Qt.AlignHCenter)
+        self.standards_widget.setVisible(text == 'Standards')
 
         # Changing the parameter dictionary to one compatible with
         # whatever calibration curve is being used
@@ -75,11 +149,106 @@ class CalibrationTab(QtWidgets.QWidget):
         # Create new widgets
         for i in range(len(entries)):
             self.line_edits[entries[i]] = QtWidgets.QLineEdit()
+            self.line_edits[entries[i]].textChanged.connect(
+                self.calibration_changed
+            )
             # Add to layout and store reference
             self.calib_input_form.addRow(
                 self.tr(entries[i]), self.line_edits[entries[i]]
             )
 
+    def _create_standards_widget(self):
+        widget = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # The retention time and peak molecular weight of each standard
+        self.standards_table = QtWidgets.QTableWidget(0, 2)
+        self.standards_table.setHorizontalHeaderLabels(
+            ['Retention Time (min)', 'Mp (g/mol)']
+        )
+        self.standards_table.horizontalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Stretch
+        )
+        add_button = QtWidgets.QPushButton('Add Standard')
+        add_button.clicked.connect(self.add_standard)
+        remove_button = QtWidgets.QPushButton('Remove Standard')
+        remove_button.clicked.connect(self.remove_standard)
+        button_box = QtWidgets.QHBoxLayout()
+        button_box.addWidget(add_button)
+        button_box.addWidget(remove_button)
+
+        # The order of the polynomial fitted to the standards
+        self.order_spin = QtWidgets.QSpinBox()
+        self.order_spin.setRange(1, MAX_ORDER)
+        self.order_spin.setValue(3)
+        order_box = QtWidgets.QFormLayout()
+        order_box.addRow('Polynomial Order', self.order_spin)
+
+        # The Mark-Houwink constants of the standards and the sample,
+        # used to convert the calibration of the standards into one
+        # for the sample
+        self.universal_group = QtWidgets.QGroupBox('Universal Calibration')
+        self.universal_group.setCheckable(True)
+        self.universal_group.setChecked(False)
+        self.mark_houwink_edits = dict()
+        universal_form = QtWidgets.QFormLayout(self.universal_group)
+        for field in MARK_HOUWINK_FIELDS:
+            self.mark_houwink_edits[field] = QtWidgets.QLineEdit()
+            universal_form.addRow(field, self.mark_houwink_edits[field])
+            self.mark_houwink_edits[field].textChanged.connect(
+                self.calibration_changed
+            )
+
+        # Rows added, removed or edited in the standards table all
+        # change the calibration
+        for signal in (self.standards_table.itemChanged,
+                       self.standards_table.model().rowsRemoved,
+                       self.order_spin.valueChanged,
+                       self.universal_group.toggled):
+            signal.connect(self.calibration_changed)
+
+        layout.addWidget(self.standards_table)
+        layout.addLayout(button_box)
+        layout.addLayout(order_box)
+        layout.addWidget(self.universal_group)
+        return widget
+
+
+    @QtCore.Slot()
+    def add_standard(self):
+        self.standards_table.insertRow(self.standards_table.rowCount())
+
+
+    @QtCore.Slot()
+    def remove_standard(self):
+        rows = {index.row() for index in
+                self.standards_table.selectedIndexes()}
+        if not rows and self.standards_table.rowCount() > 0:
+            rows = {self.standards_table.rowCount() - 1}
+        for row in sorted(rows, reverse=True):
+            self.standards_table.removeRow(row)
+
+
+    def standards(self):
+        # The text of every row of the standards table
+        rows = []
+        for row in range(self.standards_table.rowCount()):
+            items = [self.standards_table.item(row, column)
+                     for column in range(2)]
+            rows.append(tuple(item.text() if item is not None else ''
+                              for item in items))
+        return tuple(rows)
+
+
+    def set_standards(self, rows):
+        self.standards_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                self.standards_table.setItem(
+                    row, column, QtWidgets.QTableWidgetItem(str(value))
+                )
+
     @QtCore.Slot()
     def clear_line_edits(self):
         # Delete every row within the form when the type of
@@ -88,12 +257,47 @@ class CalibrationTab(QtWidgets.QWidget):
             self.calib_input_form.removeRow(0)
         self.line_edits = dict()
 
-    @QtCore.Slot()
-    def update_calibration(self):
-        for constant in self.calib_options[self.calib_type]:
-            constant_val = float(self.line_edits[constant].text())
-            self.calib_parameters[constant] = constant_val
-        return self.calib_parameters, self.calib_type.lower()
+    def show_calibration(self, calibration):
+        # Displays a calibration curve fitted from the fields by
+        # parse_calibration, which is not repeated here
+        self.calibration = calibration
+        if isinstance(calibration, PolynomialCalibration):
+            self.calib_parameters.update(
+                zip(self.calib_options[self.calib_type],
+                    calibration.coefficients)
+            )
+        self._describe_calibration(calibration)
+
+    def calibration_state(self):
+        # The raw contents of the calibration fields, used to detect
+        # whether the calibration has changed since it was applied
+        if self.calib_type == 'Standards':
+            return (self.calib_type, self.order_spin.value(),
+                    self.standards(), self.universal_group.isChecked(),
+                    tuple(self.mark_houwink_edits[field].text()
+                          for field in MARK_HOUWINK_FIELDS))
+        
+        return (self.calib_type,) + tuple(
+            self.line_edits[constant].text()
+            for constant in self.calib_options[self.calib_type]
+        )
+
+    def _describe_calibration(self, calibration):
+        # Showing the fitted curve so that it can be checked against
+        # the standards
+        reference = getattr(calibration, 'reference', calibration)
+        if reference.standards is None:
+            self.fit_label.setText('')
+            return None
+
+        coefficients = ', '.join('{:.4g}'.format(value)
+                                 for value in reference.coefficients)
+        self.fit_label.setText(
+            'Coefficients (highest power first): {}<br>'
+            'RMS error of log<sub>10</sub>(M<sub>p</sub>): {:.3g}'.format(
+                coefficients, reference.fit_error()
+            )
+        )
 
     @QtCore.Slot()
     def set_calibration(self, c_type, vals):
@@ -101,4 +305,25 @@ class CalibrationTab(QtWidgets.QWidget):
         self.select_calib_method_combo.setCurrentText(c_type.capitalize())
         for i in range(len(entries)):
             self.line_edits[entries[i]].setText(str(vals[i]))
-                    
+
+    def load_calibration(self, calibration):
+        # Filling in the fields from a stored calibration curve so that
+        # the standards do not need to be entered again
+        universal = isinstance(calibration, UniversalCalibration)
+        reference = calibration.reference if universal else calibration
+        if reference.standards is None:
+            method = {2: 'linear', 4: 'cubic'}.get(len(reference.coefficients))
+            if method is None or universal:
+                raise ValueError('The calibration cannot be shown')
+            self.set_calibration(method, reference.coefficients)
+            return None
+
+        self.select_calib_method_combo.setCurrentText('Standards')
+        self.order_spin.setValue(len(reference.coefficients) - 1)
+        self.set_standards(list(zip(*reference.standards)))
+        self.universal_group.setChecked(universal)
+        if universal:
+            constants = (calibration.standard_constants +
+                         calibration.sample_constants)
+            for field, value in zip(MARK_HOUWINK_FIELDS, constants):
+                self.mark_houwink_edits[field].setText(str(value))
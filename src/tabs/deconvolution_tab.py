@@ -1,6 +1,13 @@
+import csv
+import hashlib
 from tabs.analysis_tab import AnalysisTab
+from analysis.deconvolution import SparsePeaks
 from PySide6 import QtCore, QtWidgets, QtGui
 
+# The columns of the results table, with the keys of the results
+TABLE_COLUMNS = (('Mn (g/mol)', 'mns'), ('Mw (g/mol)', 'mws'),
+                 ('\u0110', 'disp'), ('Area (%)', 'areas'))
+
 class DeconvolutionTab(AnalysisTab):
     def __init__(self, parent=None):
         # Initial dialog box setup functions
@@ -24,23 +31,120 @@ class DeconvolutionTab(AnalysisTab):
         )
         peak_number_layout.addWidget(self.peak_number)
 
+        # The fit can be started from several initial guesses, keeping
+        # the best one, within an optional time limit after which the
+        # running starts stop with the best fit they reached; both are
+        # left blank for a single start without a limit
+        self.fit_options = {'Number of Starts:': QtWidgets.QLineEdit(),
+                            'Time Limit (s):': QtWidgets.QLineEdit()}
+        self.fit_options['Number of Starts:'].setPlaceholderText('1')
+        self.fit_options['Time Limit (s):'].setPlaceholderText('None')
+        self.fit_options['Time Limit (s):'].setToolTip(
+            'Once the limit passes no further starts are begun and the '
+            'running starts stop, keeping the best fit they reached'
+        )
+
+        fit_options_layout = QtWidgets.QFormLayout()
+        for option in self.fit_options.keys():
+            fit_options_layout.addRow(option, self.fit_options[option])
+
+        # Every trace can be deconvoluted with the same bounds and
+        # number of peaks, the selected trace is still the one shown
+        self.all_check = QtWidgets.QCheckBox('All Traces')
+
         self.peak_list = QtWidgets.QListWidget()
 
+        # A table of the peaks of every deconvoluted trace, which can
+        # be exported to a CSV file
+        self.results_table = QtWidgets.QTableWidget(0, len(TABLE_COLUMNS) + 2)
+        self.results_table.setHorizontalHeaderLabels(
+            ['Trace', 'Peak'] + [column for column, _ in TABLE_COLUMNS]
+        )
+        self.results_table.verticalHeader().setVisible(False)
+        self.results_table.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers
+        )
+        self.results_table.horizontalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.ResizeToContents
+        )
+        self.export_button = QtWidgets.QPushButton('Export Table')
+        self.export_button.setEnabled(False)
+        self.export_button.clicked.connect(self.export_table)
+
+        checkmark_box = QtWidgets.QHBoxLayout()
+        checkmark_box.addWidget(self.show_check)
+        checkmark_box.addWidget(self.all_check)
+
         self.layout.addWidget(self.selection)
         self.layout.addLayout(bounds_layout)
         self.layout.addLayout(peak_number_layout)
-        self.layout.addWidget(self.show_check)
+        self.layout.addLayout(fit_options_layout)
+        self.layout.addLayout(checkmark_box)
         self.layout.addWidget(self.peak_list)
+        self.layout.addWidget(self.results_table)
+        self.layout.addWidget(self.export_button)
+
+        self.table = None
+        self._batch = None
 
         
-    def update_analysis(self, sec_object):
-        peaks = int(self.peak_number.text())
-        lbound = float(self.bounds['Lower Bound'].text())
-        rbound = float(self.bounds['Upper Bound'].text())
-        
-        self.results = sec_object.deconvolute(
-            peaks, 0, lbound, rbound
+    def analysis_state(self):
+        return super().analysis_state() + (
+            self.peak_number.text(),
+            self.bounds['Lower Bound'].text(),
+            self.bounds['Upper Bound'].text(),
+            self.fit_options['Number of Starts:'].text(),
+            self.fit_options['Time Limit (s):'].text(),
+            self.all_check.isChecked()
         )
+
+        
+    def compute_analysis(self, sec_object, state):
+        peaks = int(state[1])
+        lbound = float(state[2])
+        rbound = float(state[3])
+        starts = int(state[4]) if state[4] else 1
+        max_time = float(state[5]) if state[5] else None
+        trace = max(state[0], 0)
+
+        if not state[6]:
+            table = sec_object.deconvolute_traces(
+                peaks, lbound, rbound, traces=[trace], starts=starts,
+                max_time=max_time
+            )
+        else:
+            # Selecting another trace does not change the fits of all
+            # the traces, so they are kept until the data or the fit
+            # options change
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(sec_object.mol_weights.tobytes())
+            # The traces are hashed a block at a time so that traces
+            # held on disk are not copied into memory all at once
+            edited_traces = sec_object.edited_traces
+            for block in sec_object.trace_blocks():
+                digest.update(edited_traces[:, block].tobytes(order='F'))
+            key = state[1:] + (digest.hexdigest(),)
+            if self._batch is None or self._batch[0] != key:
+                self._batch = (key, sec_object.deconvolute_traces(
+                    peaks, lbound, rbound, starts=starts, max_time=max_time
+                ))
+            table = self._batch[1]
+
+        table = dict(table, names=[sec_object.names[i]
+                                   for i in table['traces']])
+        row = table['traces'].index(trace) if trace in table['traces'] else 0
+        results = {key: table[key][row] for _, key in TABLE_COLUMNS}
+        results.update({
+            'peaks': SparsePeaks(table['params'][row],
+                                 sec_object.mol_weights),
+            'table': table
+        })
+        return results
+
+
+    def show_analysis(self, results):
+        self.results = results
+        self.update_table(results['table'])
         
         # Adding the information for each of the peaks to the peak
         # list widget
@@ -80,7 +184,51 @@ class DeconvolutionTab(AnalysisTab):
             self.peak_list.addItem(list_item)
             self.peak_list.setItemWidget(list_item, peak_widget)
 
+
+    def update_table(self, table):
+        # Filling the results table with one row per peak of each
+        # deconvoluted trace
+        self.table = table
+        peaks = table['params'].shape[1] // 3
+        self.results_table.setRowCount(len(table['traces'])*peaks)
+        for i, name in enumerate(table['names']):
+            for j in range(peaks):
+                row = i*peaks + j
+                cells = [name, str(j+1)] + [
+                    '{}'.format(float('{:.3g}'.format(table[key][i, j])))
+                    for _, key in TABLE_COLUMNS
+                ]
+                for column, cell in enumerate(cells):
+                    self.results_table.setItem(
+                        row, column, QtWidgets.QTableWidgetItem(cell)
+                    )
+        self.export_button.setEnabled(True)
+
+
+    @QtCore.Slot()
+    def export_table(self):
+        filename, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, 'Export Deconvolution', 'deconvolution',
+            'CSV (*.csv)'
+        )
+        if not filename or self.table is None:
+            return None
+
+        peaks = self.table['params'].shape[1] // 3
+        with open(filename, 'w', newline='') as table_file:
+            writer = csv.writer(table_file)
+            writer.writerow(['trace', 'name', 'peak', 'mn', 'mw', 'disp',
+                             'area'])
+            for i, name in enumerate(self.table['names']):
+                for j in range(peaks):
+                    writer.writerow(
+                        [self.table['traces'][i] + 1, name, j + 1] +
+                        [self.table[key][i, j] for _, key in TABLE_COLUMNS]
+                    )
+        
+
     def add_graph(self, ax_object, sec_object):
-        for i in range(len(self.results['mns'])):
-            ax_object.plot(self.results['x'], self.results['peaks'][:, i])
+        # Each peak is only drawn where it is not negligible
+        for mws, peak in self.results['peaks'].segments():
+            ax_object.plot(mws, peak)
 
@@ -1,9 +1,12 @@
 from PySide6 import QtCore, QtWidgets, QtGui
-from functools import partial
+from tabs.trace_model import (TraceListModel, ColorSwatchDelegate,
+                              NAME_COLUMN, COLOR_COLUMN, SHOWN_COLUMN)
 
-from dialogs.color_dialog import ColorDialog
 
 class GraphTab(QtWidgets.QWidget):
+    # Emitted whenever an option that changes the graph is edited
+    options_changed = QtCore.Signal()
+
     def __init__(self, parent=None):
         # Initial widget setup functions
         super().__init__(parent)
@@ -25,7 +28,9 @@ class GraphTab(QtWidgets.QWidget):
         self.select_normalization_combo = QtWidgets.QComboBox()
         self.normalization_options = {'Individual' : 'individual',
                                       'Global' : 'global',
-                                      'Point' : 'point'}
+                                      'Area' : 'area',
+                                      'Point' : 'point',
+                                      'Range Integral' : 'integral'}
         self.select_normalization_combo.addItems(
             self.normalization_options.keys()
         )
@@ -34,6 +39,10 @@ class GraphTab(QtWidgets.QWidget):
             self.update_point_normalization_edit
         )
         self.update_point_normalization_edit()
+        for signal in (self.select_baseline_combo.currentIndexChanged,
+                       self.select_normalization_combo.currentIndexChanged,
+                       self.normalization_edit.textChanged):
+            signal.connect(self.options_changed)
 
         # Determines whether the legend is shown and in which position
         self.legend_check = QtWidgets.QCheckBox()
@@ -49,9 +58,39 @@ class GraphTab(QtWidgets.QWidget):
             self.update_select_legend_combo
         )
         self.update_select_legend_combo()
+        self.legend_check.stateChanged.connect(self.options_changed)
+        self.select_legend_combo.currentIndexChanged.connect(
+            self.options_changed
+        )
 
-        # Widget that lists all of the traces currently loaded
-        self.trace_list = QtWidgets.QListWidget()
+        # View that lists all of the traces currently loaded; only the
+        # visible rows are drawn, so no widgets are created per trace
+        self.trace_model = TraceListModel(self)
+        self.trace_view = QtWidgets.QTableView()
+        self.trace_view.setModel(self.trace_model)
+        self.trace_view.setItemDelegateForColumn(
+            COLOR_COLUMN, ColorSwatchDelegate(self.trace_view)
+        )
+        self.trace_view.horizontalHeader().hide()
+        self.trace_view.verticalHeader().hide()
+        self.trace_view.verticalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.Fixed
+        )
+        self.trace_view.horizontalHeader().setSectionResizeMode(
+            NAME_COLUMN, QtWidgets.QHeaderView.Stretch
+        )
+        # Fixed sizes avoid measuring every row when traces are added
+        for column in (COLOR_COLUMN, SHOWN_COLUMN):
+            self.trace_view.horizontalHeader().setSectionResizeMode(
+                column, QtWidgets.QHeaderView.Fixed
+            )
+            self.trace_view.setColumnWidth(column, 30)
+        self.trace_view.setShowGrid(False)
+        self.trace_view.setSelectionMode(
+            QtWidgets.QAbstractItemView.NoSelection
+        )
+        self.trace_view.clicked.connect(self.open_color_dialog)
+        self.trace_model.dataChanged.connect(self.options_changed)
 
         baseline_box = QtWidgets.QHBoxLayout()
         baseline_box.addWidget(QtWidgets.QLabel('Baseline Correction:'))
@@ -67,7 +106,7 @@ class GraphTab(QtWidgets.QWidget):
         legend_box.addWidget(self.legend_check)
         legend_box.addWidget(self.select_legend_combo)
         self.layout.addLayout(legend_box)
-        self.layout.addWidget(self.trace_list)
+        self.layout.addWidget(self.trace_view)
 
         
     def update_chart_options(self):
@@ -75,87 +114,50 @@ class GraphTab(QtWidgets.QWidget):
         # the data can be properly graphed
         b_val = self.baseline_options[self.select_baseline_combo.currentText()]
         self.parameters['baseline'] = b_val
-        if self.select_normalization_combo.currentText() == 'Point':
-            n_val = self.normalization_edit.text()
-        else:
-            n_val = self.normalization_options[self.select_normalization_combo.currentText()]
-        self.parameters['normalization'] = n_val
-        traces = [self.trace_boxes[i].isChecked() for i in
-                  range(len(self.trace_boxes))]
-        self.parameters['traces'] = traces
+        # The position text is only passed on for the styles that
+        # use it, and is read when the traces are normalized
+        n_val = self.normalization_options[self.select_normalization_combo.currentText()]
+        n_text = ''
+        if n_val in ('point', 'integral'):
+            n_text = self.normalization_edit.text()
+        self.parameters['normalization'] = (n_val, n_text)
+        self.parameters['traces'] = self.trace_model.shown()
         return self.parameters
 
     
     def add_data(self, sec):
-        # Adds the sec data as a variable in order to accurately
-        # display the list of traces
-        self.trace_list.clear()
-        self.trace_edits = []
-        self.trace_buttons = []
-        self.trace_boxes = []
-        for i in range(len(sec)):
-            trace_widget = QtWidgets.QWidget()
-            trace_layout = QtWidgets.QHBoxLayout(trace_widget)
-            trace_layout.setContentsMargins(20, 0, 40, 0)
-            self.trace_edits.append(
-                QtWidgets.QLineEdit(sec.names[i])
-            )
-            self.trace_edits[i].textEdited.connect(
-                partial(self.update_trace_name, sec, int(i))
-            )
-            self.trace_buttons.append(QtWidgets.QPushButton())
-            self.trace_buttons[i].setStyleSheet(
-                'background-color: {}'.format(sec.colors[i])
-            )
-            self.trace_buttons[i].setFixedSize(20, 20)
-            self.trace_buttons[i].clicked.connect(
-                partial(self.open_color_dialog, sec, int(i))
-            )
-            self.trace_boxes.append(QtWidgets.QCheckBox())
-            trace_layout.addWidget(self.trace_edits[i])
-
-            trace_layout.addStretch()
-            trace_layout.addWidget(self.trace_buttons[i])
-            trace_layout.addWidget(self.trace_boxes[i])
-            self.trace_boxes[i].setCheckState(QtCore.Qt.Checked)
-
-            list_item = QtWidgets.QListWidgetItem()
-            list_item.setSizeHint(trace_widget.sizeHint())
-            
-            self.trace_list.addItem(list_item)
-            self.trace_list.setItemWidget(list_item, trace_widget)
+        # Adds the sec data to the trace model in order to accurately
+        # display the list of traces; traces added to the same sec
+        # object are appended without rebuilding the list
+        self.trace_model.set_sec(sec)
 
 
     def update_colors(self, sec):
-        for i in range(len(sec)):
-            self.trace_buttons[i].setStyleSheet(
-                'background-color: {}'.format(sec.colors[i])
-            )
+        self.trace_model.refresh()
             
 
-    @QtCore.Slot()
-    def open_color_dialog(self, sec, i):
+    @QtCore.Slot(QtCore.QModelIndex)
+    def open_color_dialog(self, index):
+        # Only the color column opens the dialog; the names are edited
+        # in place and the check boxes are handled by the view
+        if index.column() != COLOR_COLUMN:
+            return None
+        from dialogs.color_dialog import ColorDialog
         color = ColorDialog()
         if color.exec_():
-            sec.colors[i] = color.color
-            self.trace_buttons[i].setStyleSheet(
-                'background-color: {}'.format(sec.colors[i])
-            )
+            self.trace_model.setData(index, color.color)
             
             
     @QtCore.Slot()
     def update_point_normalization_edit(self):
-        if self.select_normalization_combo.currentText() == 'Point':
-            self.normalization_edit.setReadOnly(False)
-        else:
-            self.normalization_edit.setReadOnly(True)
+        # The point normalization takes a position and the range
+        # integral a lower and upper position separated by a comma
+        placeholders = {'Point': 'Position', 'Range Integral': 'Lower, Upper'}
+        text = self.select_normalization_combo.currentText()
+        self.normalization_edit.setReadOnly(text not in placeholders)
+        self.normalization_edit.setPlaceholderText(placeholders.get(text, ''))
             
 
-    @QtCore.Slot()
-    def update_trace_name(self, sec, i, new_name):
-        sec.names[i] = new_name
-
-        
     @QtCore.Slot()
     def update_legend_check(self):
         self.parameters['legend'] = self.legend_check.isChecked()
@@ -27,6 +27,7 @@ class PeakTab(AnalysisTab):
         self.results = {
             'mn' : QtWidgets.QLabel(),
             'mw' : QtWidgets.QLabel(),
+            'mz' : QtWidgets.QLabel(),
             'disp' : QtWidgets.QLabel(),
             'area' : QtWidgets.QLabel()
         }
@@ -34,6 +35,7 @@ class PeakTab(AnalysisTab):
         result_labels = {
             'mn' : QtWidgets.QLabel('M<sub>n</sub> (g/mol):'),
             'mw' : QtWidgets.QLabel('M<sub>w</sub> (g/mol):'),
+            'mz' : QtWidgets.QLabel('M<sub>z</sub> (g/mol):'),
             'disp' : QtWidgets.QLabel('\u0110:'),
             'area' : QtWidgets.QLabel('Area (g/mol):')
         }
@@ -45,6 +47,18 @@ class PeakTab(AnalysisTab):
             )
             result_labels[key].setAlignment(QtCore.Qt.AlignRight)
             results_layout.addWidget(self.results[key], i, 1)
+
+        # A table containing the results of every trace at once
+        self.results_table = QtWidgets.QTableWidget(0, len(self.results))
+        self.results_table.setHorizontalHeaderLabels(
+            ['Mn (g/mol)', 'Mw (g/mol)', 'Mz (g/mol)', '\u0110', 'Area']
+        )
+        self.results_table.setEditTriggers(
+            QtWidgets.QAbstractItemView.NoEditTriggers
+        )
+        self.results_table.horizontalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.ResizeToContents
+        )
                 
         # Managing the layout
         checkmark_box = QtWidgets.QHBoxLayout()
@@ -55,34 +69,64 @@ class PeakTab(AnalysisTab):
         self.layout.addLayout(self.bound_input_form)
         self.layout.addLayout(checkmark_box)
         self.layout.addLayout(results_layout)
+        self.layout.addWidget(self.results_table)
         
 
-    def update_analysis(self, sec_object):
+    def analysis_state(self):
+        return super().analysis_state() + (
+            self.lower_mw_bound_edit.text(),
+            self.upper_mw_bound_edit.text(),
+            self.cut_check.isChecked()
+        )
+        
+
+    def compute_analysis(self, sec_object, state):
+        trace, lower, upper, cut = state
         try:
-            self.params['lbound'] = float(self.lower_mw_bound_edit.text())
-            self.params['rbound'] = float(self.upper_mw_bound_edit.text())
-            self.params['cut'] = self.cut_check.isChecked()
-            self.params['show'] = self.show_check.isChecked()
+            params = {
+                'lbound': float(lower),
+                'rbound': float(upper),
+                'cut': cut,
+                'trace': trace
+            }
 
-            self.params['trace'] = self.selection.currentRow()
-            
-            results = sec_object.peak_calculator(
-                self.params['lbound'], self.params['rbound'],
-                self.params['cut'], self.params['trace']
+            # The statistics of every trace are calculated together
+            # for the results table
+            statistics = sec_object.peak_statistics(
+                params['lbound'], params['rbound'], params['cut']
             )
             
-            area = sec_object.area_calculator(
-                self.params['lbound'], self.params['rbound'],
-                self.params['cut'], self.params['trace']
-            )
+        except ValueError:
+            return None
+
+        return {
+            'params': params,
+            'names': list(sec_object.names),
+            'statistics': statistics
+        }
 
-            results.append(area)
 
-            for i, value in enumerate(self.results.values()):
-                value.setText('{}'.format(float('{:.3g}'.format(results[i]))))
-                    
-        except ValueError:
+    def show_analysis(self, results):
+        if results is None:
             return False
+
+        self.params.update(results['params'])
+        self.params['show'] = self.show_check.isChecked()
+        statistics = results['statistics']
+        for key, value in self.results.items():
+            value.setText(self._format(statistics[key][self.params['trace']]))
+
+        self.results_table.setRowCount(len(results['names']))
+        self.results_table.setVerticalHeaderLabels(results['names'])
+        for column, key in enumerate(self.results.keys()):
+            for row, value in enumerate(statistics[key]):
+                self.results_table.setItem(
+                    row, column, QtWidgets.QTableWidgetItem(self._format(value))
+                )
+
+
+    def _format(self, value):
+        return '{}'.format(float('{:.3g}'.format(value)))
         
 
     def add_graph(self, ax_object, sec_object):
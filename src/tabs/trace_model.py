@@ -0,0 +1,172 @@
+from PySide6 import QtCore, QtWidgets, QtGui
+
+# The columns of the trace model
+NAME_COLUMN = 0
+COLOR_COLUMN = 1
+SHOWN_COLUMN = 2
+
+# The size in pixels of the square showing the color of a trace
+SWATCH_SIZE = 16
+
+
+class TraceListModel(QtCore.QAbstractTableModel):
+    def __init__(self, parent=None):
+        """
+        The TraceListModel class lists the name, color and visibility
+        of every trace for the views of the tabs. The names and colors
+        are read from the sec object whenever a row is drawn, so views
+        only ask for the rows that are visible and no widgets are
+        created per trace
+
+        Parameters
+        ----------
+        parent : QObject
+            The owner of the model
+        """
+        super().__init__(parent)
+        self._sec = None
+        self._shown = []
+
+
+    def set_sec(self, sec):
+        """
+        A method that shows the traces of a sec object; when the
+        object is the one already shown only the traces added since
+        are inserted, so the views keep their state
+
+        Parameters
+        ----------
+        sec : SEC
+            The sec object whose traces are listed
+        """
+        if sec is not self._sec:
+            self.beginResetModel()
+            self._sec = sec
+            self._shown = [True] * (0 if sec is None else len(sec))
+            self.endResetModel()
+            return None
+
+        count = len(self._shown)
+        if len(sec) > count:
+            self.beginInsertRows(QtCore.QModelIndex(), count, len(sec) - 1)
+            self._shown.extend([True] * (len(sec) - count))
+            self.endInsertRows()
+        self.refresh()
+
+
+    def refresh(self):
+        """
+        A method that redraws the names and colors of the traces after
+        they were changed directly on the sec object
+        """
+        if self._shown:
+            self.dataChanged.emit(
+                self.index(0, NAME_COLUMN),
+                self.index(len(self._shown) - 1, COLOR_COLUMN)
+            )
+
+
+    def shown(self):
+        """
+        A method that returns whether each trace is shown
+
+        Returns
+        -------
+        shown : list
+            Whether each trace is shown, in the order of the traces
+        """
+        return list(self._shown)
+
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._shown)
+
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 3
+
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row, column = index.row(), index.column()
+        if column == NAME_COLUMN:
+            if role in (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole):
+                return self._sec.names[row]
+        elif column == COLOR_COLUMN:
+            if role == QtCore.Qt.DecorationRole:
+                return QtGui.QColor(self._sec.colors[row])
+            if role == QtCore.Qt.ToolTipRole:
+                return self._sec.colors[row]
+        elif column == SHOWN_COLUMN and role == QtCore.Qt.CheckStateRole:
+            if self._shown[row]:
+                return QtCore.Qt.Checked
+            return QtCore.Qt.Unchecked
+        return None
+
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if not index.isValid():
+            return False
+
+        row, column = index.row(), index.column()
+        if column == NAME_COLUMN and role == QtCore.Qt.EditRole:
+            self._sec.names[row] = str(value)
+        elif column == COLOR_COLUMN and role == QtCore.Qt.EditRole:
+            self._sec.colors[row] = str(value)
+        elif column == SHOWN_COLUMN and role == QtCore.Qt.CheckStateRole:
+            self._shown[row] = (QtCore.Qt.CheckState(value) ==
+                                QtCore.Qt.Checked)
+        else:
+            return False
+
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+
+    def flags(self, index):
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        if index.column() == NAME_COLUMN:
+            flags |= QtCore.Qt.ItemIsEditable
+        elif index.column() == SHOWN_COLUMN:
+            flags |= QtCore.Qt.ItemIsUserCheckable
+        return flags
+
+
+class ColorSwatchDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    The ColorSwatchDelegate class draws the color of a trace as a
+    filled square, in place of the button that used to be created for
+    every trace
+    """
+    def paint(self, painter, option, index):
+        # The background is drawn by the style so that selected rows
+        # look the same as in the other columns
+        self.initStyleOption(option, index)
+        option.icon = QtGui.QIcon()
+        style = (option.widget.style() if option.widget is not None
+                 else QtWidgets.QApplication.style())
+        style.drawPrimitive(
+            QtWidgets.QStyle.PE_PanelItemViewItem, option, painter,
+            option.widget
+        )
+
+        color = index.data(QtCore.Qt.DecorationRole)
+        if color is None:
+            return None
+        swatch = QtCore.QRect(0, 0, SWATCH_SIZE, SWATCH_SIZE)
+        swatch.moveCenter(option.rect.center())
+        painter.save()
+        painter.setPen(QtGui.QColor('black'))
+        painter.setBrush(color)
+        painter.drawRect(swatch)
+        painter.restore()
+
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(SWATCH_SIZE + 8, SWATCH_SIZE + 4)
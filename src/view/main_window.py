@@ -2,17 +2,30 @@ from PySide6 import QtCore, QtWidgets, QtGui
 import numpy as np
 from matplotlib.backends.backend_qtagg import FigureCanvas
 from matplotlib.figure import Figure
+import json
+import warnings
 from functools import partial
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 from analysis.sec import SEC
+from analysis.cache import TraceCache
+from analysis.ecosec import read_ecosec
+from analysis.workers import process_pool
+from analysis.calibration import calibration_from_dict
+from analysis.normalization import parse_normalization
+from view.pipeline import Pipeline
+from view.worker import PipelineWorker
+from view.renderer import TraceRenderer
 from dialogs.axes_dialog import AxesDialog
-from dialogs.export_dialog import ExportDialog
 from dialogs.traces_dialog import TracesDialog
 from tabs.graph_tab import GraphTab
-from tabs.calibration_tab import CalibrationTab
+from tabs.calibration_tab import CalibrationTab, parse_calibration
 from tabs.peak_tab import PeakTab
-from tabs.block_copolymer_tab import BlockCopolymerTab
-from tabs.deconvolution_tab import DeconvolutionTab
+
+# The time in milliseconds the graph waits after the last edit before
+# it is updated live, so that a burst of edits such as typing a number
+# results in a single update
+LIVE_UPDATE_DELAY = 300
 
 
 class Secan(QtWidgets.QMainWindow):
@@ -22,8 +35,13 @@ class Secan(QtWidgets.QMainWindow):
         self.setWindowTitle('SEC Analysis')
         self._setup_ui()
         self._create_menu_bar()
+        self._create_pipeline()
         self.sec = None
 
+        # Parsed data files are cached on disk so that reopening the
+        # same file does not require parsing it again
+        self.trace_cache = TraceCache()
+
         # Restoring previous user settings
         self.read_settings()
         self.change_x_axis_title()
@@ -48,11 +66,20 @@ class Secan(QtWidgets.QMainWindow):
         self.fig = Figure(figsize=(5, 3))
         self.canvas = FigureCanvas(self.fig)
 
+        # The axes and the trace lines are kept between redraws and
+        # updated in place
+        self._renderer = TraceRenderer(self.fig)
+        self._ax = self._renderer.ax
+        self._trace_version = 0
+        self.canvas.mpl_connect('resize_event', self._on_canvas_resize)
+
         # Fields to input the upper and lower bounds to be graphed
         self.chart_bounds_edit = {
             'lower': QtWidgets.QLineEdit(),
             'upper': QtWidgets.QLineEdit()
         }
+        for edit in self.chart_bounds_edit.values():
+            edit.textChanged.connect(self.schedule_chart)
 
         # A checkbox to determine whether the graph should use
         # retention time or molecular weight
@@ -60,6 +87,15 @@ class Secan(QtWidgets.QMainWindow):
         self.mol_weight_check.stateChanged.connect(
             self.change_x_axis_title
         )
+        self.mol_weight_check.stateChanged.connect(self.schedule_chart)
+
+    def _on_canvas_resize(self, event):
+        # The labels are fitted to the new size of the figure first,
+        # since the traces are decimated to the width of the axes and
+        # more or fewer points are needed when the window is resized
+        self._renderer.update_layout()
+        self._renderer.refresh_detail()
+        self.canvas.draw_idle()
 
     def _create_control_tabs(self):
         # Creating tabs for the user to interact with; the three
@@ -80,6 +116,15 @@ class Secan(QtWidgets.QMainWindow):
         self.tab_widget.currentChanged.connect(
             lambda i: self._update_analysis_tab_selection()
         )
+
+        # Edits to the graph options and calibration update the graph
+        # when it is updated live
+        self.tab_widget.widget(
+            self.TAB_INDICES['graph']
+        ).options_changed.connect(self.schedule_chart)
+        self.tab_widget.widget(
+            self.TAB_INDICES['calibration']
+        ).calibration_changed.connect(self.schedule_chart)
         
         
     def _create_buttons(self):
@@ -92,6 +137,16 @@ class Secan(QtWidgets.QMainWindow):
         # Button that generates the graph
         self.generate_button = QtWidgets.QPushButton("Generate Graph")
         self.generate_button.clicked.connect(self.generate_chart)
+
+        # A checkbox to update the graph automatically whenever the
+        # options are edited; the edits restart a timer so that only
+        # the last of several edits in quick succession is processed
+        self.live_check = QtWidgets.QCheckBox("Live Update")
+        self.live_check.toggled.connect(self.schedule_chart)
+        self._live_timer = QtCore.QTimer(self)
+        self._live_timer.setSingleShot(True)
+        self._live_timer.setInterval(LIVE_UPDATE_DELAY)
+        self._live_timer.timeout.connect(self._live_update)
         
         
     def _organize_layout(self, layout):
@@ -113,7 +168,10 @@ class Secan(QtWidgets.QMainWindow):
         graph_toolbox_layout = QtWidgets.QVBoxLayout()
         graph_toolbox_layout.addWidget(self.tab_widget)
         graph_toolbox_layout.addWidget(self.import_button)
-        graph_toolbox_layout.addWidget(self.generate_button)
+        generate_layout = QtWidgets.QHBoxLayout()
+        generate_layout.addWidget(self.generate_button, stretch=1)
+        generate_layout.addWidget(self.live_check)
+        graph_toolbox_layout.addLayout(generate_layout)
         layout.addLayout(graph_box_layout, stretch=3)
         layout.addLayout(graph_toolbox_layout, stretch=1)
         
@@ -123,10 +181,18 @@ class Secan(QtWidgets.QMainWindow):
         menu_bar = self.menuBar()
         menu_bar.setNativeMenuBar(False)
         
+        self._create_data_menu(menu_bar)
         self._create_graph_menu(menu_bar)
         self._create_analysis_menu(menu_bar)
         
 
+    def _create_data_menu(self, menu_bar):
+        # Populating a menu with items related to the imported data
+        data_menu = menu_bar.addMenu('Data')
+        action = data_menu.addAction('Clear Import Cache')
+        action.triggered.connect(self.clear_import_cache)
+        
+
     def _create_graph_menu(self, menu_bar):
         # Populating a menu with items related to visual settings for
         # the graph
@@ -159,30 +225,96 @@ class Secan(QtWidgets.QMainWindow):
         
     @QtCore.Slot()
     def import_sec_file(self):
-       filename, _ = QtWidgets.QFileDialog.getOpenFileName(
-           self, "Open Data File", "~/", "Text Files (*.txt *.csv)"
-       )
-
-       # Does nothing if the user does not select a file
-       if not filename:
-           return None
-
-       try:
-           # If data has already been imported, then importing more
-           # data should add to the list of traces that can be graphed
-           # or analyzed
-           if self.sec is None:
-               self.sec = SEC(filename)
-           else:
-               self.sec.append(SEC(filename))
-               
-           self._update_ui_after_import()
-
-       except Exception as e:
+        filenames, _ = QtWidgets.QFileDialog.getOpenFileNames(
+            self, "Open Data Files", "~/", "Text Files (*.txt *.csv)"
+        )
+
+        # Does nothing if the user does not select a file
+        if not filenames:
+            return None
+
+        try:
+            new_secs = self._read_sec_files(filenames)
+            if new_secs is None:
+                return None
+
+            # The traces cannot be extended while a chart request is
+            # still processing them
+            self._cancel_chart_worker(wait=True)
+
+            # If data has already been imported, then importing more
+            # data should add to the list of traces that can be
+            # graphed or analyzed
+            if self.sec is None:
+                self.sec = new_secs.pop(0)
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                self.sec.extend(new_secs)
+
+            self._update_ui_after_import()
+
+            # Traces resampled onto a grid they do not span are still
+            # imported, but the user is told about the extended edges
+            for warning in caught:
+                QtWidgets.QMessageBox.warning(
+                    self, "Import Warning", str(warning.message)
+                )
+
+        except Exception as e:
             QtWidgets.QMessageBox.critical(
                 self, "Import Error", f"Failed to import file: {str(e)}"
             )
 
+
+    def _read_sec_files(self, filenames):
+        # np.loadtxt holds the GIL while it parses, so files missing
+        # from the cache are parsed in worker processes; the threads
+        # only wait for the parses and load the cached files, which
+        # keeps the interface responsive
+        pool = process_pool()
+        def parse(filename):
+            return pool.submit(read_ecosec, filename).result()
+
+        progress = QtWidgets.QProgressDialog(
+            "Importing data files...", "Cancel", 0, len(filenames), self
+        )
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(200)
+
+        new_secs = [None] * len(filenames)
+        executor = ThreadPoolExecutor()
+        try:
+            futures = {
+                executor.submit(SEC, filename, self.trace_cache,
+                                reader=parse): i
+                for i, filename in enumerate(filenames)
+            }
+            pending = set(futures)
+            while pending:
+                done, pending = wait(
+                    pending, timeout=0.05, return_when=FIRST_COMPLETED
+                )
+                for future in done:
+                    # Results are stored by position so the traces
+                    # keep the order in which the files were selected
+                    new_secs[futures[future]] = future.result()
+                progress.setValue(len(filenames) - len(pending))
+                QtWidgets.QApplication.processEvents()
+
+                if progress.wasCanceled():
+                    return None
+        finally:
+            # A cancelled import returns without waiting for the files
+            # that are still being read, whose results are discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return new_secs
+
+
+    @QtCore.Slot()
+    def clear_import_cache(self):
+        self.trace_cache.clear()
+
             
     def _update_ui_after_import(self):
         graph_tab = self.tab_widget.widget(
@@ -191,6 +323,7 @@ class Secan(QtWidgets.QMainWindow):
         graph_tab.add_data(self.sec)
         
         self._update_analysis_tab_selection()
+        self.schedule_chart()
 
 
     @QtCore.Slot()
@@ -204,6 +337,9 @@ class Secan(QtWidgets.QMainWindow):
         
     @QtCore.Slot()
     def open_graph_menu_item(self, menu_item):
+        # The export dialog is only imported once it is first opened
+        # since it is not needed to start the program
+        from dialogs.export_dialog import ExportDialog
         dialog_map = {
             'axes': lambda: AxesDialog(self.axes_options),
             'traces': lambda: TracesDialog(self.trace_options, self.sec),
@@ -232,15 +368,20 @@ class Secan(QtWidgets.QMainWindow):
 
         # The options within in the analysis menu change the identity
         # of the analysis tab to whichever analysis is desired to be
-        # used
-        tab_type = {
-            'peak': PeakTab,
-            'block': BlockCopolymerTab,
-            'deconvolution': DeconvolutionTab
-        }
+        # used; the module of each tab is only imported once the tab
+        # is first selected, with static imports so that they are
+        # still found when the application is frozen
+        if new_tab == 'block':
+            from tabs.block_copolymer_tab import BlockCopolymerTab
+            tab_class = BlockCopolymerTab
+        elif new_tab == 'deconvolution':
+            from tabs.deconvolution_tab import DeconvolutionTab
+            tab_class = DeconvolutionTab
+        else:
+            tab_class = PeakTab
         
         self.tab_widget.insertTab(
-            analysis_tab_index, tab_type[new_tab](), 'Analysis'
+            analysis_tab_index, tab_class(), 'Analysis'
         )
         self.tab_widget.removeTab(analysis_tab_index+1)
 
@@ -258,20 +399,27 @@ class Secan(QtWidgets.QMainWindow):
             self.axes_options['x axis title'] = 'Retention Time (min)'
 
 
-    def _get_chart_bounds(self, use_mw):
+    def _get_chart_bounds(self, use_mw, lower_text=None, upper_text=None):
         methods = {
             True : self.sec.get_weight_position,
             False : self.sec.get_time_position
         }
+
+        # The bounds are read from the bound fields unless their text
+        # is given, which allows them to be computed off the GUI thread
+        if lower_text is None:
+            lower_text = self.chart_bounds_edit['lower'].text()
+        if upper_text is None:
+            upper_text = self.chart_bounds_edit['upper'].text()
         
         try:
-            lower_val = float(self.chart_bounds_edit['lower'].text())
+            lower_val = float(lower_text)
             lbound = methods[use_mw](lower_val)
         except ValueError:
             lbound = -1 if use_mw else 0
 
         try:
-            upper_val = float(self.chart_bounds_edit['upper'].text())
+            upper_val = float(upper_text)
             rbound = methods[use_mw](upper_val)
         except ValueError:
             rbound = 0 if use_mw else -1
@@ -282,12 +430,14 @@ class Secan(QtWidgets.QMainWindow):
         return lbound, rbound
 
 
-    def _setup_x_axis(self):
-        use_mw = self.mol_weight_check.isChecked()
-        lbound, rbound = self._get_chart_bounds(use_mw)
+    def _setup_x_axis(self, use_mw, lower_text, upper_text):
+        lbound, rbound = self._get_chart_bounds(
+            use_mw, lower_text, upper_text
+        )
 
         if use_mw:
-            self._ax.set_xscale('log')
+            if self._ax.get_xscale() != 'log':
+                self._ax.set_xscale('log')
             independent_variable = self.sec.mol_weights
             self._ax.set_xlim(
                 self.sec.mol_weights[rbound],
@@ -297,6 +447,8 @@ class Secan(QtWidgets.QMainWindow):
             return independent_variable, lbound, rbound, 'mw'
         
         else:
+            if self._ax.get_xscale() != 'linear':
+                self._ax.set_xscale('linear')
             independent_variable = self.sec.retention_times
             self._ax.set_xlim(
                 self.sec.retention_times[lbound],
@@ -306,51 +458,234 @@ class Secan(QtWidgets.QMainWindow):
             return independent_variable, lbound, rbound, 'rt'
 
 
-    def _apply_axes_formatting(self):
+    def _apply_axes_formatting(self, axes_options):
         for spine in self._ax.spines.values():
-            spine.set_linewidth(self.axes_options['axes linewidth'])
+            spine.set_linewidth(axes_options['axes linewidth'])
 
         self._ax.tick_params(
             which='major',
-            length=self.axes_options['tick length'],
-            width=self.axes_options['tick width'],
-            direction=self.axes_options['tick style'],
-            labelsize=self.axes_options['tick labelsize']
+            length=axes_options['tick length'],
+            width=axes_options['tick width'],
+            direction=axes_options['tick style'],
+            labelsize=axes_options['tick labelsize']
         )
         self._ax.tick_params(
             which='minor',
-            length=self.axes_options['minor tick length'],
-            width=self.axes_options['minor tick width'],
-            direction=self.axes_options['minor tick style']
+            length=axes_options['minor tick length'],
+            width=axes_options['minor tick width'],
+            direction=axes_options['minor tick style']
         )
 
         # Set axis labels
         self._ax.set_xlabel(
-            self.axes_options['x axis title'],
-            fontsize=self.axes_options['x axis fontsize']
+            axes_options['x axis title'],
+            fontsize=axes_options['x axis fontsize']
         )
         self._ax.set_ylabel(
-            self.axes_options['y axis title'],
-            fontsize=self.axes_options['y axis fontsize']
+            axes_options['y axis title'],
+            fontsize=axes_options['y axis fontsize']
         )
         
         # Set y-axis limits
         self._ax.set_ylim(
-            self.axes_options['y axis min'],
-            self.axes_options['y axis max']
+            axes_options['y axis min'],
+            axes_options['y axis max']
         )
 
 
-    def _plot_traces(self, independent_variable, trace_visibility):
-        for i in range(len(self.sec)):
-            if trace_visibility[i]:
-                self._ax.plot(
-                    independent_variable,
-                    self.sec.edited_traces[:, i],
-                    color=self.sec.colors[i],
-                    label=self.sec.names[i],
-                    linewidth=self.trace_options['linewidth']
-                )
+    def _plot_traces(self, independent_variable, trace_visibility, colors,
+                     names, linewidth):
+        self._renderer.update_traces(
+            independent_variable, self.sec.edited_traces,
+            self._trace_version, colors, names, trace_visibility, linewidth
+        )
+
+            
+    def _create_pipeline(self):
+        # The chart is generated by a sequence of stages, each of
+        # which is only recomputed when its inputs or the stages it
+        # depends on change; for example toggling the legend only
+        # redraws the chart while a new calibration redoes the
+        # calibration, normalization and analysis
+        self.pipeline = Pipeline()
+        self.pipeline.add_stage(
+            'load', self._load_stage, inputs=('data',)
+        )
+        self.pipeline.add_stage(
+            'calibrate', self._calibrate_stage,
+            inputs=('calibration',), depends=('load',)
+        )
+        self.pipeline.add_stage(
+            'baseline', self._baseline_stage,
+            inputs=('baseline',), depends=('load',)
+        )
+        self.pipeline.add_stage(
+            'normalize', self._normalize_stage,
+            inputs=('normalization',), depends=('calibrate', 'baseline')
+        )
+        self.pipeline.add_stage(
+            'analyze', self._analyze_stage,
+            inputs=('analysis',), depends=('normalize',)
+        )
+        self.pipeline.add_stage(
+            'render', self._render_stage,
+            inputs=('display',), depends=('analyze',)
+        )
+
+        # Every stage except rendering runs on a single background
+        # thread, one request at a time, so that the traces are never
+        # modified by two requests at once
+        self.COMPUTE_STAGES = (
+            'load', 'calibrate', 'baseline', 'normalize', 'analyze'
+        )
+        # Live updates leave the analysis, which can take far longer
+        # than the rest of the chart, to the Generate Graph button
+        self.LIVE_STAGES = self.COMPUTE_STAGES[:-1]
+        self._rendered_display = None
+        self.thread_pool = QtCore.QThreadPool()
+        self.thread_pool.setMaxThreadCount(1)
+        self._worker = None
+        self._job = 0
+        self._calibration_results = (None, None)
+        self._job_live = False
+
+
+    def _pipeline_inputs(self):
+        # Collects the current value of everything the chart depends
+        # on, in a form that can be compared with previous values;
+        # the stages only read these values so that they can safely
+        # run off the GUI thread
+        graph_tab = self.tab_widget.widget(self.TAB_INDICES['graph'])
+        parameters = dict(graph_tab.update_chart_options())
+        calibration_tab = self.tab_widget.widget(
+            self.TAB_INDICES['calibration']
+        )
+        analysis_tab = self.tab_widget.widget(
+            self.TAB_INDICES['analysis']
+        )
+        bounds = (
+            self.chart_bounds_edit['lower'].text(),
+            self.chart_bounds_edit['upper'].text(),
+            self.mol_weight_check.isChecked()
+        )
+        
+        return {
+            'data': (id(self.sec), len(self.sec)),
+            'calibration': calibration_tab.calibration_state(),
+            'baseline': parameters['baseline'],
+            'normalization': (parameters['normalization'],) + bounds,
+            'analysis': (id(analysis_tab),) + analysis_tab.analysis_state(),
+            # Captured here so that the analysis stage does not look up
+            # the tab widget from the worker thread, and the chart is
+            # drawn with the tab the analysis was computed by
+            'analyzer': analysis_tab.compute_analysis,
+            'overlay': analysis_tab.add_graph,
+            'display': (
+                parameters['legend'], parameters['legend loc'],
+                tuple(parameters['traces']), tuple(self.sec.colors),
+                tuple(self.sec.names), tuple(self.axes_options.items()),
+                tuple(self.trace_options.items()),
+                analysis_tab.show_check.isChecked()
+            ) + bounds
+        }
+
+
+    def _load_stage(self, values):
+        # Newly imported traces start from the raw data
+        self.sec.reset_traces()
+
+
+    def _calibrate_stage(self, values):
+        # An incomplete calibration does not stop the chart, which can
+        # still be shown against retention time, so the error is kept
+        # and reported once the chart is ready
+        try:
+            calibration = parse_calibration(values['calibration'])
+        except ValueError as e:
+            self._calibration_results = (None, e)
+            return None
+
+        if calibration is not None:
+            self.sec.set_calibration(calibration)
+        self._calibration_results = (calibration, None)
+
+
+    def _baseline_stage(self, values):
+        self.sec.reset_traces()
+        self.sec.adjust_baseline(values['baseline'])
+
+        # The baseline corrected traces are kept so that changing the
+        # normalization does not require fitting the baselines again
+        self.sec.save_edits()
+
+
+    def _normalize_stage(self, values):
+        normalization, lower_text, upper_text, use_mw = values['normalization']
+        style, position_text = normalization
+        position = parse_normalization(style, position_text)
+        lbound, rbound = self._get_chart_bounds(
+            use_mw, lower_text, upper_text
+        )
+        
+        self.sec.restore_edits()
+        self.sec.peak_normalize(
+            style, lbound, rbound, 'mw' if use_mw else 'rt', position
+        )
+
+        # Marks the edited traces as changed so the renderer copies
+        # the new data into the trace lines
+        self._trace_version += 1
+
+
+    def _analyze_stage(self, values):
+        self._analysis_results = (
+            values['analysis'][0],
+            values['analyzer'](self.sec, values['analysis'][1:])
+        )
+
+
+    def _render_stage(self, values):
+        # The chart is drawn only from the values of the request, so
+        # that edits made while the request was processed cannot mix
+        # with the traces that were computed from the earlier values
+        (legend, legend_loc, traces, colors, names, axes_options,
+         trace_options, show_analysis, lower_text, upper_text,
+         use_mw) = values['display']
+        axes_options = dict(axes_options)
+        
+        ind_var, lbound, rbound, x_type = self._setup_x_axis(
+            use_mw, lower_text, upper_text
+        )
+
+        self._plot_traces(
+            ind_var, traces, colors, names,
+            dict(trace_options)['linewidth']
+        )
+        self._apply_axes_formatting(axes_options)
+
+        # The analysis is left out of live updates, so its overlay is
+        # hidden while it no longer matches the traces
+        stale = 'analyze' in self.pipeline.dirty_stages(values)
+        if show_analysis and not stale:
+            self._renderer.update_overlay(
+                lambda ax: values['overlay'](ax, self.sec)
+            )
+        else:
+            self._renderer.update_overlay(None)
+        if show_analysis and stale:
+            self.statusBar().showMessage(
+                "Press Generate Graph to update the analysis"
+            )
+
+        self._renderer.update_legend(legend, legend_loc)
+
+        # The layout only needs to be recalculated when the labels,
+        # ticks or axis type change
+        self._renderer.update_layout(
+            (tuple(axes_options.items()), x_type)
+        )
+        self._rendered_display = values['display']
+        self.canvas.draw_idle()
 
             
     @QtCore.Slot()
@@ -361,59 +696,101 @@ class Secan(QtWidgets.QMainWindow):
                 self, "No Data", "Please load data before generating chart"
             )
             return None
-        
-        if True:
-            self.sec.reset_traces()
-            self.fig.clf()
-            self.fig.set_canvas(self.canvas)
-            self._ax = self.canvas.figure.add_subplot()
 
-            try:
-                calibration_params = self.tab_widget.widget(
-                    self.TAB_INDICES['calibration']
-                ).update_calibration()
-                self.sec.add_calibration(*calibration_params)
-            
-            except Exception as e:
-                pass
+        self._live_timer.stop()
+        self._start_chart_worker(self._pipeline_inputs(), live=False)
 
-            graph_tab = self.tab_widget.widget(
-                self.TAB_INDICES['graph']
-            )
-            general_parameters = graph_tab.update_chart_options()
-            ind_var, lbound, rbound, x_type = self._setup_x_axis()
 
-            self.sec.adjust_baseline(general_parameters['baseline'])
-            self.sec.peak_normalize(
-                general_parameters['normalization'], lbound, rbound,
-                x_type
-            )
+    @QtCore.Slot()
+    def schedule_chart(self):
+        # Every edit restarts the timer, so a burst of edits is
+        # coalesced into a single update once the edits pause
+        if self.live_check.isChecked() and self.sec is not None:
+            self._live_timer.start()
 
-            self._plot_traces(
-                ind_var, general_parameters['traces']
-            )
-            self._apply_axes_formatting()
 
-            analysis_tab = self.tab_widget.widget(
-                self.TAB_INDICES['analysis']
-            )
-            analysis_tab.update_analysis(self.sec)
-            if analysis_tab.show_check.isChecked():
-                analysis_tab.add_graph(self._ax, self.sec)
+    @QtCore.Slot()
+    def _live_update(self):
+        # Edits that leave every input unchanged, such as retyping a
+        # value, do not start any work
+        if self.sec is None:
+            return None
+        values = self._pipeline_inputs()
+        dirty = self.pipeline.dirty_stages(values)
+        if (any(stage in self.LIVE_STAGES for stage in dirty) or
+            values['display'] != self._rendered_display):
+            self._start_chart_worker(values, live=True)
+
+
+    def _start_chart_worker(self, values, live):
+        # A new request supersedes any request still being processed;
+        # the superseded request stops before its next stage and its
+        # results are discarded
+        self._cancel_chart_worker()
+        self._job += 1
+        self._job_values = values
+        self._job_live = live
+
+        self._worker = PipelineWorker(
+            self._job, self.pipeline, self._job_values,
+            self.LIVE_STAGES if live else self.COMPUTE_STAGES
+        )
+        self._worker.signals.finished.connect(self._chart_ready)
+        self._worker.signals.error.connect(self._chart_failed)
+        self.thread_pool.start(self._worker)
 
-            if general_parameters['legend']:
-                leg = self._ax.legend(loc=general_parameters['legend loc'])
-                leg.get_frame().set_linewidth(0.0)
 
-            self.fig.tight_layout()
-            self.canvas.draw()
+    def _cancel_chart_worker(self, wait=False):
+        if self._worker is not None:
+            self._worker.cancel()
+        if wait:
+            self.thread_pool.waitForDone()
 
-        """
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(
-                self, "Chart Generation Error", f"Failed to generate chart: {str(e)}"
+
+    @QtCore.Slot(int, object)
+    def _chart_ready(self, job, ran):
+        # Results from a superseded request are ignored
+        if job != self._job:
+            return None
+
+        self.statusBar().clearMessage()
+        analysis_tab = self.tab_widget.widget(
+            self.TAB_INDICES['analysis']
+        )
+        if 'analyze' in ran and self._analysis_results[0] == id(analysis_tab):
+            analysis_tab.show_analysis(self._analysis_results[1])
+        if 'calibrate' in ran:
+            calibration, error = self._calibration_results
+            if error is not None:
+                self.statusBar().showMessage(
+                    f"Calibration not applied: {str(error)}"
+                )
+            elif calibration is not None:
+                self.tab_widget.widget(
+                    self.TAB_INDICES['calibration']
+                ).show_calibration(calibration)
+
+        self.pipeline.run(self._job_values, ('render',))
+
+
+    @QtCore.Slot(int, object)
+    def _chart_failed(self, job, error):
+        if job != self._job:
+            return None
+
+        # Options are often invalid part way through being edited, so
+        # live updates report errors without interrupting the user
+        if self._job_live:
+            self.statusBar().showMessage(
+                f"Graph not updated: {str(error)}"
             )
-        """
+            return None
+        
+        QtWidgets.QMessageBox.critical(
+            self, "Chart Generation Error",
+            f"Failed to generate chart: {str(error)}"
+        )
+
 
     def _get_settings_object(self):
         return QtCore.QSettings('Taleff', 'Secan')
@@ -422,6 +799,7 @@ class Secan(QtWidgets.QMainWindow):
     def write_settings(self):
         # Creating a settings object
         settings = self._get_settings_object()
+        settings.setValue('live update', self.live_check.isChecked())
         
         # Saving all of the axes options used to generate the graph
         settings.beginGroup('Axes')
@@ -441,16 +819,30 @@ class Secan(QtWidgets.QMainWindow):
             self.TAB_INDICES['calibration']
         )
         calib_vals = list(calibration_tab.calib_parameters.values())   
-        if not None in calib_vals:
+        if calib_vals and not None in calib_vals:
             calib_type = calibration_tab.calib_type.lower()
             settings.setValue('values', calib_vals)
             settings.setValue('type', calib_type)
+
+        # The whole calibration curve, including any standards it was
+        # fitted to, is stored so that nothing has to be entered again;
+        # any other curve is fully described by its values, and a
+        # stored curve would otherwise be loaded in their place
+        calibration = calibration_tab.calibration
+        reference = getattr(calibration, 'reference', calibration)
+        if reference is not None and reference.standards is not None:
+            settings.setValue('curve', json.dumps(calibration.to_dict()))
+        else:
+            settings.remove('curve')
         settings.endGroup()
         
 
     def read_settings(self, default=False):
         # Creating a settings object
         settings = self._get_settings_object()
+        self.live_check.setChecked(
+            settings.value('live update', False, type=bool)
+        )
         
         # Reading all of the axes options used to generate the graph
         settings.beginGroup('Axes')
@@ -479,16 +871,25 @@ class Secan(QtWidgets.QMainWindow):
         # Reading the saved calibration values
         settings.beginGroup('Calibration')
         calib_style = settings.value('type')
-        if calib_style is not None:
+        calib_curve = settings.value('curve')
+        calibration_tab = self.tab_widget.widget(
+            self.TAB_INDICES['calibration']
+        )
+        if calib_curve is not None:
+            try:
+                calibration_tab.load_calibration(
+                    calibration_from_dict(json.loads(calib_curve))
+                )
+            except (ValueError, KeyError):
+                calib_curve = None
+        if calib_curve is None and calib_style is not None:
             calib_vals = settings.value('values', [], type=list)
-            calibration_tab = self.tab_widget.widget(
-                self.TAB_INDICES['calibration']
-            )
             calibration_tab.set_calibration(calib_style, calib_vals)
         settings.endGroup()
         
 
     def closeEvent(self, event):
+        self._cancel_chart_worker(wait=True)
         self.write_settings()
         event.accept()
 
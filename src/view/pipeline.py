@@ -0,0 +1,150 @@
+class Stage:
+    def __init__(self, name, function, inputs=(), depends=()):
+        """
+        The Stage class is a single step of a pipeline, recomputed
+        only when its inputs or one of the stages it depends on change
+
+        Parameters
+        ----------
+        name : string
+            The name of the stage
+        function : callable
+            The function that performs the stage, called with the
+            dictionary of pipeline input values
+        inputs : tuple
+            The names of the pipeline inputs read by the stage
+        depends : tuple
+            The names of the stages whose results the stage uses
+
+        Attributes
+        ----------
+        snapshot : tuple
+            The values of the inputs when the stage last ran, or None
+            if the stage must be run again
+        """
+        self.name = name
+        self.function = function
+        self.inputs = tuple(inputs)
+        self.depends = tuple(depends)
+        self.snapshot = None
+
+
+class Pipeline:
+    def __init__(self):
+        """
+        The Pipeline class runs a sequence of stages in order, skipping
+        any stage whose inputs and upstream stages are unchanged since
+        it last ran
+        """
+        self._stages = []
+
+
+    def add_stage(self, name, function, inputs=(), depends=()):
+        """
+        A method that adds a stage to the end of the pipeline
+
+        Parameters
+        ----------
+        name : string
+            The name of the stage
+        function : callable
+            The function that performs the stage, called with the
+            dictionary of pipeline input values
+        inputs : tuple
+            The names of the pipeline inputs read by the stage
+        depends : tuple
+            The names of earlier stages whose results the stage uses
+        """
+        known = {stage.name for stage in self._stages}
+        for dependency in depends:
+            if dependency not in known:
+                raise ValueError(
+                    f'Stage {name} depends on unknown stage {dependency}'
+                )
+        self._stages.append(Stage(name, function, inputs, depends))
+
+
+    def dirty_stages(self, values):
+        """
+        A method that returns which stages would run for a set of
+        input values
+
+        Parameters
+        ----------
+        values : dict
+            The current value of every pipeline input
+
+        Returns
+        -------
+        dirty : list
+            The names of the stages that would be recomputed
+        """
+        dirty = []
+        for stage in self._stages:
+            snapshot = tuple(values[key] for key in stage.inputs)
+            if (stage.snapshot is None or snapshot != stage.snapshot or
+                any(dependency in dirty for dependency in stage.depends)):
+                dirty.append(stage.name)
+        return dirty
+
+
+    def run(self, values, stages=None, cancelled=None):
+        """
+        A method that runs every stage whose inputs changed, along
+        with every stage downstream of it
+
+        Parameters
+        ----------
+        values : dict
+            The current value of every pipeline input
+        stages : tuple
+            The names of the stages that may be run, all stages are
+            run if it is None; dirty stages that are left out are run
+            by a later call
+        cancelled : callable
+            A function checked before each stage, the remaining stages
+            are left dirty once it returns True
+
+        Returns
+        -------
+        ran : list
+            The names of the stages that were recomputed
+        """
+        dirty = self.dirty_stages(values)
+
+        # The snapshots of every dirty stage are cleared first so
+        # that a stage which fails, is cancelled or is left out of
+        # this call is run again on the next request
+        for stage in self._stages:
+            if stage.name in dirty:
+                stage.snapshot = None
+
+        ran = []
+        for stage in self._stages:
+            if stage.name not in dirty:
+                continue
+            if stages is not None and stage.name not in stages:
+                continue
+            if cancelled is not None and cancelled():
+                break
+
+            stage.function(values)
+            stage.snapshot = tuple(values[key] for key in stage.inputs)
+            ran.append(stage.name)
+        return ran
+
+
+    def invalidate(self, name=None):
+        """
+        A method that forces a stage, and every stage downstream of
+        it, to run on the next request
+
+        Parameters
+        ----------
+        name : string
+            The name of the stage to invalidate, all stages are
+            invalidated if it is None
+        """
+        for stage in self._stages:
+            if name is None or stage.name == name:
+                stage.snapshot = None
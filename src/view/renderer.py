@@ -0,0 +1,257 @@
+from math import ceil
+import numpy as np
+
+
+def minmax_decimate(x, traces, xmin, xmax, bins):
+    """
+    Chooses the points of each trace to draw within an x range so
+    that every bin keeps its minimum and maximum, which leaves the
+    drawn line, including its peaks, visually identical
+
+    Parameters
+    ----------
+    x : 1darray
+        The monotonic values of the independent variable
+    traces : 2darray
+        A 2D numpy array with one trace per column
+    xmin : float
+        The lower limit of the visible range
+    xmax : float
+        The upper limit of the visible range
+    bins : int
+        The number of bins, usually the width of the axes in pixels
+
+    Returns
+    -------
+    indices : 2darray
+        A 2D numpy array with the indices of the points to draw for
+        each trace per column, or None if every point should be drawn
+    """
+    num_x = len(x)
+    lower, upper = min(xmin, xmax), max(xmin, xmax)
+    if x[0] <= x[-1]:
+        start = np.searchsorted(x, lower)
+        stop = np.searchsorted(x, upper, side='right')
+    else:
+        start = num_x - np.searchsorted(x[::-1], upper, side='right')
+        stop = num_x - np.searchsorted(x[::-1], lower)
+
+    # One point beyond each side of the range is kept so that the
+    # lines reach the edges of the axes
+    start = max(start - 1, 0)
+    stop = min(stop + 1, num_x)
+    if stop - start <= 2*bins:
+        return None
+
+    size = ceil((stop - start) / bins)
+    full = (stop - start) // size
+    edges = np.arange(start, stop, size)
+    blocks = traces[start:start + full*size].reshape(full, size, -1)
+    lows = [blocks.argmin(axis=1) + edges[:full, None]]
+    highs = [blocks.argmax(axis=1) + edges[:full, None]]
+    if start + full*size < stop:
+        tail = traces[start + full*size:stop]
+        lows.append(tail.argmin(axis=0)[None, :] + start + full*size)
+        highs.append(tail.argmax(axis=0)[None, :] + start + full*size)
+
+    num_traces = traces.shape[1]
+    indices = np.concatenate(lows + highs, axis=0)
+    indices.sort(axis=0)
+    return np.concatenate((
+        np.full((1, num_traces), start), indices,
+        np.full((1, num_traces), stop - 1)
+    ))
+
+
+class TraceRenderer:
+    def __init__(self, figure):
+        """
+        The TraceRenderer class draws the SEC traces on a single set
+        of axes that is kept between redraws, with one line per trace
+        that is updated in place so that the cost of a redraw depends
+        on what changed rather than on the number of traces. Each line
+        only receives the minimum and maximum of the points falling
+        within each pixel column of the visible range.
+
+        The canvas is redrawn in full rather than blitted. The detail
+        of the lines only changes with the x range or the size of the
+        axes, which also change the ticks, and the overlays are only
+        replaced when the chart is rendered, which also applies the
+        limits, the axis formatting and the legend again, so there is
+        no redraw in which a saved background would still be valid
+
+        Parameters
+        ----------
+        figure : Figure
+            The matplotlib figure on which the traces are drawn
+
+        Attributes
+        ----------
+        ax : Axes
+            The axes on which the traces are drawn
+        lines : list
+            The line of each trace, in the order of the traces
+        """
+        self.figure = figure
+        self.ax = figure.add_subplot()
+        self.lines = []
+        self._overlays = []
+        self._legend = None
+        self._data_version = None
+        self._x = None
+        self._traces = np.empty((0, 0))
+        self._columns = {}
+        self._line_views = []
+        self._layout_key = None
+
+        # The decimated data of the lines depends on the visible range
+        # and on the size of the axes in pixels
+        self.ax.callbacks.connect('xlim_changed', self.refresh_detail)
+
+
+    def update_traces(self, x, traces, version, colors, names, visibility,
+                      linewidth):
+        """
+        A method that updates the line of every trace, creating lines
+        for new traces and only replacing the data of existing lines
+        when the traces have changed
+
+        Parameters
+        ----------
+        x : 1darray
+            The values of the independent variable
+        traces : 2darray
+            A 2D numpy array with one trace per column
+        version : int
+            A number that changes whenever the values of the traces
+            change, used to skip copying unchanged data
+        colors : list
+            The color of each trace
+        names : list
+            The name of each trace, shown in the legend
+        visibility : list
+            Whether each trace is shown
+        linewidth : float
+            The width of the trace lines
+        """
+        # The data of the visible traces is copied so that the lines
+        # are not affected by later changes to the traces; hidden
+        # traces are not copied, so the memory used is bounded by the
+        # traces being plotted rather than by all of the traces
+        visible = [i for i in range(traces.shape[1]) if visibility[i]]
+        if (version != self._data_version or x is not self._x or
+            traces.shape[1] != len(self._line_views) or
+            any(i not in self._columns for i in visible)):
+            self._x = x
+            self._traces = np.array(traces[:, visible], order='F')
+            self._columns = {i: j for j, i in enumerate(visible)}
+            self._data_version = version
+            self._line_views = [None] * traces.shape[1]
+
+        for i in range(traces.shape[1]):
+            if i == len(self.lines):
+                line, = self.ax.plot([], [])
+                self.lines.append(line)
+            line = self.lines[i]
+            line.set_visible(visibility[i])
+            line.set_color(colors[i])
+            line.set_label(names[i])
+            line.set_linewidth(linewidth)
+
+        self.refresh_detail()
+
+
+    def refresh_detail(self, *args):
+        """
+        A method that sets the data of every visible line, decimated
+        to the current x range and width of the axes; hidden lines
+        and lines already showing the current view are skipped
+        """
+        if self._x is None:
+            return None
+
+        xmin, xmax = self.ax.get_xlim()
+        bins = max(int(self.ax.bbox.width), 1)
+        view = (xmin, xmax, bins)
+        update = [i for i, line in enumerate(self.lines[:len(self._line_views)])
+                  if line.get_visible() and self._line_views[i] != view]
+        if not update:
+            return None
+
+        columns = [self._columns[i] for i in update]
+        indices = minmax_decimate(
+            self._x, self._traces[:, columns], xmin, xmax, bins
+        )
+        for j, (i, column) in enumerate(zip(update, columns)):
+            if indices is None:
+                self.lines[i].set_data(self._x, self._traces[:, column])
+            else:
+                self.lines[i].set_data(
+                    self._x[indices[:, j]],
+                    self._traces[indices[:, j], column]
+                )
+            self._line_views[i] = view
+
+
+    def update_overlay(self, draw):
+        """
+        A method that replaces the artists drawn on top of the traces,
+        such as the visual representation of an analysis
+
+        Parameters
+        ----------
+        draw : callable
+            A function taking the axes that draws the new overlay, or
+            None to only remove the previous overlay
+        """
+        for artist in self._overlays:
+            artist.remove()
+        self._overlays = []
+
+        if draw is not None:
+            existing = set(self.ax.get_children())
+            draw(self.ax)
+            self._overlays = [artist for artist in self.ax.get_children()
+                              if artist not in existing]
+
+
+    def update_legend(self, show, loc):
+        """
+        A method that shows or hides the legend of the visible traces
+
+        Parameters
+        ----------
+        show : bool
+            Whether the legend is shown
+        loc : string
+            The location of the legend
+        """
+        if self._legend is not None:
+            self._legend.remove()
+            self._legend = None
+
+        if show:
+            handles = [line for line in self.lines if line.get_visible()]
+            self._legend = self.ax.legend(handles=handles, loc=loc)
+            self._legend.get_frame().set_linewidth(0.0)
+
+
+    def update_layout(self, key=None):
+        """
+        A method that fits the axes to the figure when anything
+        affecting the size of the labels, or the size of the figure
+        itself, has changed
+
+        Parameters
+        ----------
+        key : tuple
+            The values affecting the layout of the figure, the values
+            given last are kept if it is None, as when only the figure
+            is resized
+        """
+        if key is None:
+            key = self._layout_key[0] if self._layout_key else None
+        key = (key, tuple(self.figure.bbox.size))
+        if key != self._layout_key:
+            self.figure.tight_layout()
+            self._layout_key = key
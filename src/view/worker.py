@@ -0,0 +1,61 @@
+from PySide6 import QtCore
+
+
+class WorkerSignals(QtCore.QObject):
+    # QRunnable is not a QObject, so the signals used to report the
+    # results back to the interface live on a separate object
+    finished = QtCore.Signal(int, object)
+    error = QtCore.Signal(int, object)
+
+
+class PipelineWorker(QtCore.QRunnable):
+    def __init__(self, job, pipeline, values, stages=None):
+        """
+        The PipelineWorker class runs the stages of a pipeline on a
+        thread pool so that the interface stays responsive while the
+        traces are processed
+
+        Parameters
+        ----------
+        job : int
+            An identifier of the request, reported back with the
+            results so that stale results can be discarded
+        pipeline : Pipeline
+            The pipeline to run
+        values : dict
+            The value of every pipeline input for this request
+        stages : tuple
+            The names of the stages that may be run on the worker
+        """
+        super().__init__()
+        self.setAutoDelete(False)
+        self.job = job
+        self.pipeline = pipeline
+        self.values = values
+        self.stages = stages
+        self.signals = WorkerSignals()
+        self._cancelled = False
+
+
+    def cancel(self):
+        """
+        A method that requests the worker to stop before its next
+        stage; a stage that has already started runs to completion
+        """
+        self._cancelled = True
+
+
+    def is_cancelled(self):
+        return self._cancelled
+
+
+    def run(self):
+        try:
+            ran = self.pipeline.run(
+                self.values, self.stages, cancelled=self.is_cancelled
+            )
+        except Exception as e:
+            self.signals.error.emit(self.job, e)
+        else:
+            if not self._cancelled:
+                self.signals.finished.emit(self.job, ran)